@@ -0,0 +1,291 @@
+import asyncio
+import time
+import pandas as pd
+from db_connections import (obtener_cliente_mongo_async, obtener_driver_neo4j_async, obtener_cliente_redis_async,
+                            obtener_cliente_redis_binario_async)
+from src import mongo, neo4j, recomendaciones, redis, utils
+from src.metricas import instrumentar, registrar_cache, registrar_lote
+
+# Versiones async de las funciones principales de src.mongo, src.neo4j y src.redis.
+# Usan los drivers async de cada librería, por lo que varias consultas independientes
+# pueden ejecutarse a la vez dentro de un mismo event loop (ver consultar_en_paralelo).
+
+#--------------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+#                                               MongoDB
+#--------------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+async def coleccion_existe_async(db, nombre_coleccion):
+    """
+    Versión async de mongo.coleccion_existe: comparte su catálogo local y solo consulta
+    al servidor si la colección no figura en él.
+    """
+    if mongo._en_catalogo(db.name, nombre_coleccion):
+        return True
+
+    colecciones = set(await db.list_collection_names())
+    mongo._reemplazar_catalogo(db.name, colecciones)
+    return nombre_coleccion in colecciones
+
+async def obtener_cursor_async(nombre_base, nombre_coleccion, limite=None, filtro=None, proyeccion=None):
+    """
+    Versión async de mongo.obtener_cursor. Retorna un AsyncCursor para la consulta.
+
+    Parametros:
+        nombre_base: nombre de la base de datos dentro de mongoDB
+        nombre_colección: colección de la cual se quieren obtener datos
+        limite (opcional): limite de registros que desean obtener.
+        filtro (opcional): filtro para la consulta a la base.
+        proyeccion (opcional): campos a proyectar
+    """
+    db = obtener_cliente_mongo_async()[nombre_base]
+    if not await coleccion_existe_async(db, nombre_coleccion):
+        raise KeyError(
+            f"La colección '{nombre_coleccion}' no existe en la base '{nombre_base}'.")
+
+    cursor = db[nombre_coleccion].find(filter=filtro or {}, projection=proyeccion)
+    if limite is not None:
+        cursor = cursor.limit(limite)
+    return cursor
+
+@instrumentar("mongo", contar_resultado=True)
+async def buscar_async(nombre_base, nombre_coleccion, limite=None, filtro=None, proyeccion=None):
+    """
+    Ejecuta la consulta de obtener_cursor_async y devuelve la lista de documentos.
+    """
+    cursor = await obtener_cursor_async(nombre_base, nombre_coleccion, limite, filtro, proyeccion)
+    return await cursor.to_list()
+
+@instrumentar("mongo")
+async def insertar_muchos_coleccion_async(nombre_base, nombre_coleccion, datos, ordenado=False):
+    """
+    Versión async de mongo.insertar_muchos_coleccion.
+    """
+    lista_datos = list(datos)
+    if not lista_datos:
+        return None
+
+    db = obtener_cliente_mongo_async()[nombre_base]
+    resultado = await db[nombre_coleccion].insert_many(lista_datos, ordered=ordenado)
+    await invalidar_cache_async(nombre_coleccion)
+    if nombre_coleccion in mongo.RESUMENES_COLECCIONES:
+        nombre_resumen = f"resumen_{nombre_coleccion}"
+        if not await coleccion_existe_async(db, nombre_resumen):
+            # Como en mongo.actualizar_resumen: sin resumen previo se materializa completo
+            await asyncio.to_thread(mongo.materializar_resumen, nombre_base, nombre_coleccion)
+        else:
+            operaciones = mongo.operaciones_resumen(nombre_coleccion, lista_datos)
+            if operaciones:
+                await db[nombre_resumen].bulk_write(operaciones, ordered=False)
+    return resultado
+
+#--------------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+#                                               Neo4j
+#--------------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+@instrumentar("neo4j", contar_resultado=True)
+async def consulta_async(query, parametros=None):
+    """
+    Versión async de neo4j.consulta: ejecuta una query y devuelve un DataFrame.
+    """
+    async with obtener_driver_neo4j_async().session() as session:
+        resultados = await session.run(query, parametros)
+        data = [record.data() async for record in resultados]
+    return pd.DataFrame(data)
+
+async def _ejecutar_lote_async(tx, query, filas):
+    result = await tx.run(query, filas=filas)
+    record = await result.single()
+    return record["cantidad"]
+
+@instrumentar("neo4j")
+async def crear_nodos_masivo_async(nombre_nodo, clave_id, filas, tamano_lote=1000):
+    """
+    Versión async de neo4j.crear_nodos_masivo. Retorna la cantidad de nodos procesados.
+    """
+    query = neo4j.query_nodos_lote(nombre_nodo, clave_id)
+    total = 0
+    async with obtener_driver_neo4j_async().session() as session:
+        for lote in utils.dividir_en_lotes(filas, tamano_lote):
+            total += await session.execute_write(_ejecutar_lote_async, query, lote)
+            registrar_lote("neo4j", filas=len(lote))
+    return total
+
+@instrumentar("neo4j")
+async def crear_relaciones_masivo_async(df, nodo_origen, campo_origen, columna_origen,
+                                        nodo_destino, campo_destino, columna_destino,
+                                        columna_tipo=None, tipo_relacion=None,
+                                        bidireccional=False, tamano_lote=5000):
+    """
+    Versión async de neo4j.crear_relaciones_masivo. Retorna la cantidad de relaciones procesadas.
+    """
+    if columna_tipo is None and tipo_relacion is None:
+        raise ValueError("Se debe indicar 'columna_tipo' o 'tipo_relacion'.")
+
+    if df is None or df.empty:
+        return 0
+
+    df_rel = df[[columna_origen, columna_destino]].rename(
+        columns={columna_origen: "origen", columna_destino: "destino"})
+    if columna_tipo is not None:
+        grupos = df_rel.groupby(df[columna_tipo], sort=False, observed=True)
+    else:
+        grupos = [(tipo_relacion, df_rel)]
+
+    total = 0
+    escritas = []
+    async with obtener_driver_neo4j_async().session() as session:
+        for tipo, df_tipo in grupos:
+            query = neo4j.query_relaciones_lote(nodo_origen, campo_origen, nodo_destino,
+                                                campo_destino, tipo, bidireccional)
+            for lote in utils.dividir_en_lotes(df_tipo.to_dict("records"), tamano_lote):
+                total += await session.execute_write(_ejecutar_lote_async, query, lote)
+                registrar_lote("neo4j", filas=len(lote))
+            escritas.append((tipo, df_tipo))
+
+    # Igual que en neo4j.crear_relaciones_masivo; el mantenimiento es sincrónico y corre en un hilo
+    if nodo_origen == "Usuario":
+        for tipo, df_tipo in escritas:
+            destinos = df_tipo["destino"].tolist() if nodo_destino == "Usuario" else ()
+            await asyncio.to_thread(recomendaciones.mantener_recomendaciones,
+                                    tipo, df_tipo["origen"].tolist(), destinos)
+    return total
+
+#--------------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+#                                               Redis
+#--------------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+async def obtener_version_cache_async(tipo):
+    """
+    Versión async de redis.obtener_version_cache.
+    """
+    registrar_lote("redis")
+    return int(await obtener_cliente_redis_async().get(f"version_cache:{tipo}") or 0)
+
+async def generar_clave_cache_async(tipo, parametros):
+    """
+    Versión async de redis.generar_clave_cache.
+    """
+    return redis.armar_clave_cache(tipo, await obtener_version_cache_async(tipo), parametros)
+
+async def invalidar_cache_async(tipo):
+    """
+    Versión async de redis.invalidar_cache.
+    """
+    registrar_lote("redis")
+    return await obtener_cliente_redis_async().incr(f"version_cache:{tipo}")
+
+async def _leer_valor_cache_async(clave, crudo):
+    """
+    Versión async de redis.leer_valor_cache.
+    """
+    resultado, claves_paginas = redis.interpretar_valor_cache(clave, crudo)
+    if not claves_paginas:
+        return resultado
+    paginas = await obtener_cliente_redis_binario_async().mget(claves_paginas)
+    registrar_lote("redis")
+    return redis.unir_paginas_cache(paginas)
+
+@instrumentar("redis")
+async def obtener_cache_async(tipo, parametros, version=None):
+    """
+    Versión async de redis.obtener_cache (version: por defecto la vigente).
+    """
+    if version is None:
+        version = await obtener_version_cache_async(tipo)
+    clave = redis.armar_clave_cache(tipo, version, parametros)
+    crudo = await obtener_cliente_redis_binario_async().get(clave)
+    resultado = await _leer_valor_cache_async(clave, crudo)
+    registrar_lote("redis")
+    registrar_cache(tipo, resultado is not None)
+    return resultado
+
+@instrumentar("redis")
+async def guardar_en_cache_async(tipo, parametros, resultado, ttl=600, max_bytes=None, politica=None,
+                                 version=None):
+    """
+    Versión async de redis.guardar_en_cache.
+    """
+    if version is None:
+        version = await obtener_version_cache_async(tipo)
+    clave = redis.armar_clave_cache(tipo, version, parametros)
+    try:
+        entradas, argumentos = redis.preparar_guardado_cache(tipo, clave, resultado, ttl, max_bytes, politica)
+        registrar_lote("redis", viajes=1 if entradas else 0)
+        if not entradas or not await obtener_cliente_redis_async().eval(redis.SCRIPT_PRESUPUESTO_CACHE, *argumentos):
+            await obtener_cliente_redis_binario_async().set(clave, redis.MARCA_SIN_CACHE, ex=ttl)
+            registrar_lote("redis")
+            return False
+
+        async with obtener_cliente_redis_binario_async().pipeline(transaction=False) as pipe:
+            for clave_entrada, valor in entradas:
+                pipe.set(clave_entrada, valor, ex=ttl)
+            await pipe.execute()
+        registrar_lote("redis", filas=len(resultado))
+        return True
+    except Exception:
+        return False
+
+@instrumentar("redis")
+async def carga_masiva_hashes_async(filas, prefijo, campo_id, campos=None, ttl=None,
+                                    sufijo=None, tamano_lote=1000, transaccional=False, indice=None):
+    """
+    Versión async de redis.carga_masiva_hashes (indice: sorted set de vencimientos, ver
+    redis.indice_reservas_temporales). Retorna la cantidad de claves escritas.
+    """
+    total = 0
+    for lote in utils.dividir_en_lotes(filas, tamano_lote):
+        async with obtener_cliente_redis_async().pipeline(transaction=transaccional) as pipe:
+            ahora = time.time()
+            for fila in lote:
+                clave = redis.generar_clave(prefijo, fila[campo_id], sufijo)
+                nombres = campos or [c for c in fila if c != campo_id]
+                pipe.hset(clave, mapping={c: fila[c] for c in nombres})
+                if ttl:
+                    pipe.expire(clave, ttl)
+                if indice:
+                    pipe.zadd(indice, {clave: ahora + ttl if ttl else "+inf"})
+            if indice:
+                pipe.zremrangebyscore(indice, "-inf", ahora)
+                if ttl:
+                    pipe.expire(indice, ttl, nx=True)
+                    pipe.expire(indice, ttl, gt=True)
+            await pipe.execute()
+        registrar_lote("redis", filas=len(lote))
+        total += len(lote)
+    return total
+
+#--------------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+#                                               Consultas combinadas
+#--------------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+async def consultar_en_paralelo(*consultas):
+    """
+    Ejecuta a la vez varias consultas async independientes y devuelve sus resultados en orden.
+
+    Ejemplo:
+        hoteles, actividades = await consultar_en_paralelo(
+            buscar_async("clase", "hoteles", filtro={"ciudad": "Salta"}),
+            buscar_async("clase", "actividades", filtro={"ciudad": "Salta"}))
+    """
+    return await asyncio.gather(*consultas)
+
+async def buscar_con_cache_async(nombre_base, tipo, filtro=None, proyeccion=None, ttl=600):
+    """
+    Busca en la caché de Redis y, si no está, consulta MongoDB y guarda el resultado.
+    """
+    filtro = filtro or {}
+    # Igual que en cache.consulta_cacheada, la proyección forma parte de la clave
+    parametros = dict(filtro)
+    if proyeccion is not None:
+        parametros["_proyeccion"] = proyeccion
+
+    # La versión se lee una sola vez: si una escritura la invalida durante la consulta,
+    # el resultado se guarda en la versión vieja y no en la nueva
+    version = await obtener_version_cache_async(tipo)
+    resultado = await obtener_cache_async(tipo, parametros, version)
+    if resultado is None:
+        resultado = redis.normalizar_resultado_cache(
+            await buscar_async(nombre_base, tipo, filtro=filtro, proyeccion=proyeccion))
+        # También los vacíos, para no volver a consultar MongoDB en cada búsqueda sin resultados
+        await guardar_en_cache_async(tipo, parametros, resultado, ttl=ttl, version=version)
+    return resultado
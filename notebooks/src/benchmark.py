@@ -0,0 +1,567 @@
+import contextlib
+import functools
+import io
+import json
+import platform
+import re
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+import db_connections
+from db_connections import db_neo4j
+from src import mongo, neo4j, redis, utils
+
+# Benchmarks de la capa src contra dobles locales: MongoDB y Redis en memoria (mongomock y
+# fakeredis) y un Neo4j que responde consultas grabadas. Miden el costo del lado de Python
+# (armado de lotes, conversiones, DataFrames), no el de los servidores reales.
+#
+# Las cifras de MongoDB no representan a un servidor: mongomock revisa cada índice único contra
+# toda la colección y recorre la colección en cada búsqueda, así que sus tiempos crecen de forma
+# cuadrática con el tamaño. Sirven para comparar versiones con los mismos parámetros, por eso los
+# tamaños por defecto son chicos.
+#
+# Uso desde la carpeta notebooks:
+#     python -m src.benchmark --usuarios 1000 --reservas 2000
+# o desde un notebook:
+#     from src import benchmark
+#     benchmark.ejecutar_benchmarks(n_usuarios=1_000, n_reservas=2_000)
+
+CARPETA_RESULTADOS = "resultados_benchmark"
+NOMBRE_BASE = "benchmark"
+
+# Métricas comparadas entre versiones y si un valor más alto es mejor
+METRICAS = {"filas_por_seg": True, "p50_ms": False, "p99_ms": False, "memoria_pico_mb": False}
+
+#--------------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+#                                               Neo4j con consultas grabadas
+#--------------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+def _normalizar_query(query):
+    return re.sub(r"\s+", " ", query).strip()
+
+class RegistroGrabado:
+    """
+    Registro devuelto por Neo4jGrabado, con la misma interfaz que neo4j.Record.
+    """
+    def __init__(self, datos):
+        self._datos = datos
+
+    def __getitem__(self, clave):
+        if isinstance(clave, int):
+            return list(self._datos.values())[clave]
+        return self._datos[clave]
+
+    def get(self, clave, defecto=None):
+        return self._datos.get(clave, defecto)
+
+    def keys(self):
+        return list(self._datos.keys())
+
+    def values(self):
+        return list(self._datos.values())
+
+    def data(self):
+        return dict(self._datos)
+
+class ResultadoGrabado:
+    """
+    Resultado de una consulta de Neo4jGrabado, con la misma interfaz que neo4j.Result.
+    """
+    def __init__(self, filas):
+        self._registros = [RegistroGrabado(fila) for fila in filas]
+
+    def __iter__(self):
+        return iter(self._registros)
+
+    def keys(self):
+        return self._registros[0].keys() if self._registros else []
+
+    def peek(self):
+        return self._registros[0] if self._registros else None
+
+    def single(self):
+        return self._registros[0] if self._registros else None
+
+    def data(self):
+        return [registro.data() for registro in self._registros]
+
+    def consume(self):
+        self._registros = []
+
+class SesionGrabada:
+    """
+    Sesión de Neo4jGrabado. Las transacciones se ejecutan sobre la misma sesión.
+    """
+    def __init__(self, driver):
+        self._driver = driver
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def close(self):
+        pass
+
+    def run(self, query, parameters=None, **kwargs):
+        return self._driver.responder(query, {**(parameters or {}), **kwargs})
+
+    def execute_write(self, funcion, *args, **kwargs):
+        return funcion(self, *args, **kwargs)
+
+    execute_read = execute_write
+
+class Neo4jGrabado:
+    """
+    Reemplazo del driver de Neo4j que no se conecta a ningún servidor: registra cada
+    consulta recibida y responde con filas grabadas de antemano.
+
+    Las escrituras en lote de src.neo4j (parámetros 'filas') responden la cantidad de filas
+    recibidas, como lo haría Neo4j. El resto de las consultas se busca en `respuestas`
+    (query -> lista de diccionarios o función que recibe los parámetros); si no está, devuelve
+    un resultado vacío.
+    """
+    def __init__(self, respuestas=None):
+        self.respuestas = {_normalizar_query(q): filas for q, filas in (respuestas or {}).items()}
+        self.consultas = []
+
+    @classmethod
+    def desde_archivo(cls, ruta):
+        """
+        Crea el driver con las respuestas guardadas por grabar_consultas.
+        """
+        with open(ruta, encoding="utf-8") as archivo:
+            return cls(json.load(archivo))
+
+    def session(self, **config):
+        return SesionGrabada(self)
+
+    def close(self):
+        pass
+
+    def responder(self, query, parametros):
+        self.consultas.append((query, parametros))
+        filas = self.respuestas.get(_normalizar_query(query))
+        if callable(filas):
+            filas = filas(parametros)
+        if filas is None:
+            filas = [{"cantidad": len(parametros["filas"])}] if "filas" in parametros else []
+        return ResultadoGrabado(filas)
+
+def grabar_consultas(driver, consultas, ruta):
+    """
+    Ejecuta consultas de solo lectura contra un Neo4j real y guarda sus resultados en un JSON
+    para reproducirlas luego con Neo4jGrabado.desde_archivo.
+
+    Parametros:
+        driver: driver de Neo4j conectado (db_neo4j)
+        consultas: lista de queries Cypher sin parámetros
+        ruta: archivo JSON de salida
+    """
+    respuestas = {}
+    with driver.session() as session:
+        for query in consultas:
+            respuestas[query] = [
+                {clave: neo4j._valor_plano(valor) for clave, valor in record.items()}
+                for record in session.run(query)
+            ]
+    with open(ruta, "w", encoding="utf-8") as archivo:
+        json.dump(respuestas, archivo, ensure_ascii=False, default=str)
+    print(f"✅ {len(respuestas)} consultas grabadas en {ruta}")
+
+#--------------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+#                                               Dobles en memoria
+#--------------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+def _sin_sort(metodo):
+    # pymongo 4.x pasa 'sort' a las operaciones de bulk_write y mongomock 4.3 no lo acepta
+    @functools.wraps(metodo)
+    def envoltura(self, *args, sort=None, **kwargs):
+        if sort is not None:
+            raise NotImplementedError("mongomock no soporta 'sort' en bulk_write.")
+        return metodo(self, *args, **kwargs)
+    return envoltura
+
+def _con_merge(aggregate):
+    # mongomock 4.3 no implementa $merge: se ejecuta el resto del pipeline y se reemplaza o
+    # inserta cada documento por _id (el único modo que usa src.mongo)
+    @functools.wraps(aggregate)
+    def envoltura(self, pipeline, *args, **kwargs):
+        if not pipeline or "$merge" not in pipeline[-1]:
+            return aggregate(self, pipeline, *args, **kwargs)
+        merge = pipeline[-1]["$merge"]
+        if merge.get("on", "_id") != "_id" or merge.get("whenMatched", "merge") != "replace" \
+                or merge.get("whenNotMatched", "insert") != "insert":
+            raise NotImplementedError("El $merge de los benchmarks solo reemplaza o inserta por _id.")
+        destino = self.database[merge["into"]]
+        for documento in aggregate(self, pipeline[:-1], *args, **kwargs):
+            destino.replace_one({"_id": documento["_id"]}, documento, upsert=True)
+        return iter([])
+    return envoltura
+
+@contextlib.contextmanager
+def _compatibilidad_mongomock(mongomock):
+    """
+    Completa durante el bloque lo que src.mongo usa y mongomock no soporta: bulk_write con las
+    operaciones de pymongo 4.x y $merge. Solo se reemplazan métodos públicos.
+    """
+    from mongomock.collection import BulkOperationBuilder, Collection
+
+    parches = [(BulkOperationBuilder, nombre, _sin_sort(getattr(BulkOperationBuilder, nombre)))
+               for nombre in ("add_update", "add_replace", "add_delete")]
+    parches.append((Collection, "aggregate", _con_merge(Collection.aggregate)))
+
+    originales = [(objeto, nombre, getattr(objeto, nombre)) for objeto, nombre, _ in parches]
+    for objeto, nombre, valor in parches:
+        setattr(objeto, nombre, valor)
+    try:
+        yield
+    finally:
+        for objeto, nombre, valor in originales:
+            setattr(objeto, nombre, valor)
+
+@contextlib.contextmanager
+def clientes_en_memoria(respuestas_neo4j=None):
+    """
+    Reemplaza durante el bloque los clientes de db_connections por dobles en memoria.
+    Al salir se restauran los clientes que había antes.
+
+    Retorna (en el with):
+        diccionario nombre -> cliente en memoria
+    """
+    try:
+        import fakeredis
+        import mongomock
+    except ImportError as e:
+        raise ImportError("Los benchmarks necesitan 'mongomock', 'fakeredis' y 'lupa' (ver python/requirements.txt).") from e
+
+    # Los dos clientes de Redis (texto y binario) comparten el mismo servidor en memoria
+    servidor_redis = fakeredis.FakeServer()
+    dobles = {
+        "mongo": mongomock.MongoClient(),
+        "neo4j": Neo4jGrabado(respuestas_neo4j),
+        "redis": fakeredis.FakeRedis(server=servidor_redis, decode_responses=True),
+        "redis_binario": fakeredis.FakeRedis(server=servidor_redis),
+    }
+    anteriores = db_connections.usar_clientes(**dobles)
+    # Los catálogos guardan lo que vieron en los clientes anteriores
+    mongo.invalidar_catalogo()
+    neo4j.invalidar_catalogo_neo4j()
+    try:
+        with _compatibilidad_mongomock(mongomock):
+            yield dobles
+    finally:
+        db_connections.usar_clientes(**anteriores)
+        mongo.invalidar_catalogo()
+        neo4j.invalidar_catalogo_neo4j()
+
+#--------------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+#                                               Medición
+#--------------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+def _verificar_salida(salida):
+    # Las funciones de src informan los errores que atrapan con un mensaje en pantalla
+    errores = [linea for linea in salida.getvalue().splitlines() if "❌" in linea or "Error" in linea]
+    if errores:
+        raise RuntimeError(errores[0].strip())
+
+def medir(funcion, preparar=tuple, repeticiones=10, filas=None):
+    """
+    Ejecuta una función varias veces y devuelve sus métricas. La preparación de los argumentos
+    (ej. copiar un DataFrame) no se cuenta en el tiempo. La memoria pico se mide con tracemalloc
+    en una ejecución adicional, para que su costo no afecte las latencias.
+    Si la función falla, aunque solo lo informe por pantalla (❌ o 'Error'), lanza RuntimeError:
+    así no se mide el camino de error como si fuera el normal.
+
+    Parametros:
+        funcion: función a medir
+        preparar: función sin argumentos que devuelve la tupla de argumentos de cada ejecución
+        repeticiones: cantidad de ejecuciones medidas
+        filas (opcional): filas procesadas por ejecución, para calcular el throughput
+    Retorna:
+        diccionario con repeticiones, filas, filas_por_seg, p50_ms, p99_ms y memoria_pico_mb
+    """
+    tiempos = []
+    # Los mensajes de las funciones de carga no se muestran durante la medición
+    salida = io.StringIO()
+    with contextlib.redirect_stdout(salida):
+        for _ in range(repeticiones):
+            args = preparar()
+            inicio = time.perf_counter()
+            funcion(*args)
+            tiempos.append(time.perf_counter() - inicio)
+            _verificar_salida(salida)
+
+        args = preparar()
+        tracemalloc.start()
+        try:
+            funcion(*args)
+            _, pico = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        _verificar_salida(salida)
+
+    p50, p99 = np.percentile(tiempos, [50, 99])
+    return {
+        "repeticiones": repeticiones,
+        "filas": filas,
+        "filas_por_seg": round(filas / p50, 1) if filas and p50 > 0 else None,
+        "p50_ms": round(p50 * 1000, 3),
+        "p99_ms": round(p99 * 1000, 3),
+        "memoria_pico_mb": round(pico / 2**20, 3),
+    }
+
+#--------------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+#                                               Casos
+#--------------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+# Consulta de Neo4j cuya respuesta se arma a partir del dataset generado
+QUERY_VISITAS = """
+MATCH (u:Usuario)-[:VISITO]->(d:Destino)
+RETURN u.usuario_id AS usuario_id, d.destino_id AS destino_id
+"""
+
+def armar_casos(datos, carpeta):
+    """
+    Arma la lista de casos a medir. Cada caso es un diccionario con su nombre, su tipo
+    ('carga' o 'consulta'), la función, la preparación de sus argumentos y las filas que procesa.
+
+    Parametros:
+        datos: diccionario colección -> DataFrame del dataset generado
+        carpeta: carpeta con los CSV del dataset
+    """
+    usuarios, destinos, reservas = datos["usuarios"], datos["destinos"], datos["reservas"]
+    filtro = {"estado": "Pagada"}
+    parametros_cache = {"ciudad": "Salta"}
+    resultado_cache = destinos.head(50).to_dict("records")
+
+    return [
+        # Lectura de las fuentes: CSV con esquema y snapshot Parquet
+        {"nombre": "utils.leer_fuente:csv", "tipo": "carga", "filas": len(reservas),
+         "funcion": utils.leer_fuente, "preparar": lambda: ("reservas.csv", False, carpeta)},
+        {"nombre": "utils.leer_fuente:snapshot", "tipo": "carga", "filas": len(reservas),
+         "funcion": utils.leer_fuente, "preparar": lambda: ("reservas.csv", True, carpeta)},
+
+        # Cargas
+        {"nombre": "mongo.insertar_en_mongo:reservas", "tipo": "carga", "filas": len(reservas),
+         "funcion": mongo.insertar_en_mongo, "preparar": lambda: (NOMBRE_BASE, "reservas", reservas.copy())},
+        {"nombre": "mongo.insertar_en_mongo:usuarios", "tipo": "carga", "filas": len(usuarios),
+         "funcion": mongo.insertar_en_mongo, "preparar": lambda: (NOMBRE_BASE, "usuarios", usuarios.copy())},
+        {"nombre": "redis.insertar_en_redis:reservas", "tipo": "carga", "filas": len(reservas),
+         "funcion": redis.insertar_en_redis, "preparar": lambda: ("reservas", reservas.copy())},
+        {"nombre": "neo4j.crear_nodos_neo4j:usuarios", "tipo": "carga", "filas": len(usuarios),
+         "funcion": neo4j.crear_nodos_neo4j, "preparar": lambda: ("usuarios", usuarios.copy())},
+        {"nombre": "neo4j.crear_relaciones_visito", "tipo": "carga", "filas": len(reservas),
+         "funcion": neo4j.crear_relaciones_visito, "preparar": lambda: (reservas.copy(),)},
+
+        # Consultas (después de las cargas, sobre los datos ya insertados)
+        {"nombre": "mongo.obtener_dataframe:reservas", "tipo": "consulta", "filas": None,
+         "funcion": mongo.obtener_dataframe, "preparar": lambda: (NOMBRE_BASE, "reservas", filtro)},
+        {"nombre": "mongo.contar_documentos:reservas", "tipo": "consulta", "filas": None,
+         "funcion": mongo.contar_documentos, "preparar": lambda: (NOMBRE_BASE, "reservas")},
+        {"nombre": "mongo.contador:reservas_por_estado", "tipo": "consulta", "filas": None,
+         "funcion": mongo.contador, "preparar": lambda: (NOMBRE_BASE, "reservas", "estado")},
+        {"nombre": "redis.guardar_en_cache", "tipo": "consulta", "filas": None,
+         "funcion": redis.guardar_en_cache, "preparar": lambda: ("destinos", parametros_cache, resultado_cache)},
+        {"nombre": "redis.obtener_cache", "tipo": "consulta", "filas": None,
+         "funcion": redis.obtener_cache, "preparar": lambda: ("destinos", parametros_cache)},
+        {"nombre": "redis.listar_reservas_temporales", "tipo": "consulta", "filas": None,
+         "funcion": redis.listar_reservas_temporales, "preparar": tuple},
+        {"nombre": "neo4j.consulta:visitas", "tipo": "consulta", "filas": None,
+         "funcion": neo4j.consulta, "preparar": lambda: (db_neo4j, QUERY_VISITAS)},
+    ]
+
+def generar_dataset(carpeta, n_usuarios, n_reservas, semilla=42):
+    """
+    Genera con utils.generar_csv_datos_masivos un dataset del tamaño pedido y lo lee tipado.
+
+    Retorna:
+        diccionario colección -> DataFrame
+    """
+    with contextlib.redirect_stdout(io.StringIO()):
+        utils.generar_csv_datos_masivos(n_usuarios=n_usuarios, n_reservas=n_reservas,
+                                        semilla=semilla, carpeta=carpeta)
+    return {
+        nombre: utils.leer_fuente(f"{nombre}.csv", carpeta=carpeta)
+        for nombre in ["usuarios", "destinos", "hoteles", "reservas"]
+    }
+
+#--------------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+#                                               Resultados
+#--------------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+def _commit_actual():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "sin_git"
+
+def guardar_resultados(resultados, parametros, carpeta=CARPETA_RESULTADOS):
+    """
+    Guarda los resultados de una ejecución en '<carpeta>/<fecha>_<commit>.json',
+    junto con los parámetros del dataset y las versiones usadas.
+
+    Retorna:
+        ruta del archivo guardado
+    """
+    commit = _commit_actual()
+    fecha = datetime.now()
+    ruta = Path(carpeta) / f"{fecha:%Y%m%d_%H%M%S}_{commit}.json"
+    ruta.parent.mkdir(parents=True, exist_ok=True)
+    contenido = {
+        "fecha": fecha.isoformat(timespec="seconds"),
+        "commit": commit,
+        "parametros": parametros,
+        "versiones": {"python": platform.python_version(), "pandas": pd.__version__, "numpy": np.__version__},
+        "resultados": resultados.to_dict("records"),
+    }
+    with open(ruta, "w", encoding="utf-8") as archivo:
+        json.dump(contenido, archivo, ensure_ascii=False, indent=1)
+    return ruta
+
+def cargar_resultados(ruta):
+    """
+    Lee un archivo de resultados y devuelve sus métricas como DataFrame indexado por caso.
+    """
+    with open(ruta, encoding="utf-8") as archivo:
+        return pd.DataFrame(json.load(archivo)["resultados"]).set_index("nombre")
+
+def _parametros_resultados(ruta):
+    with open(ruta, encoding="utf-8") as archivo:
+        return json.load(archivo).get("parametros")
+
+def ultimos_resultados(carpeta=CARPETA_RESULTADOS, excluir=None, parametros=None):
+    """
+    Devuelve la ruta del archivo de resultados más reciente (o None si no hay ninguno).
+
+    Parametros:
+        excluir (opcional): ruta a ignorar (ej. la de la ejecución actual)
+        parametros (opcional): solo se consideran las ejecuciones con estos mismos parámetros,
+            ya que las métricas de datasets o repeticiones distintas no son comparables
+    """
+    rutas = sorted(p for p in Path(carpeta).glob("*.json") if p != excluir)
+    if parametros is not None:
+        rutas = [ruta for ruta in rutas if _parametros_resultados(ruta) == parametros]
+    return rutas[-1] if rutas else None
+
+def comparar_resultados(anterior, actual, tolerancia=0.10):
+    """
+    Compara dos ejecuciones caso por caso y marca las regresiones.
+
+    Parametros:
+        anterior / actual: rutas de archivos de resultados o DataFrames de cargar_resultados
+        tolerancia: variación relativa a partir de la cual un empeoramiento es regresión
+    Retorna:
+        DataFrame con el valor anterior, el actual y la variación de cada métrica
+    """
+    if not isinstance(anterior, pd.DataFrame):
+        anterior = cargar_resultados(anterior)
+    if not isinstance(actual, pd.DataFrame):
+        actual = cargar_resultados(actual)
+
+    filas = []
+    for nombre in actual.index.intersection(anterior.index):
+        for metrica, mayor_es_mejor in METRICAS.items():
+            antes, ahora = anterior.at[nombre, metrica], actual.at[nombre, metrica]
+            if pd.isna(antes) or pd.isna(ahora) or antes == 0:
+                continue
+            variacion = (ahora - antes) / antes
+            empeora = -variacion if mayor_es_mejor else variacion
+            filas.append({"nombre": nombre, "metrica": metrica, "anterior": antes, "actual": ahora,
+                          "variacion": round(variacion, 3), "regresion": empeora > tolerancia})
+    return pd.DataFrame(filas)
+
+#--------------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+#                                               Ejecución
+#--------------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+def ejecutar_benchmarks(n_usuarios=1_000, n_reservas=2_000, repeticiones_carga=3,
+                        repeticiones_consulta=50, semilla=42, carpeta_resultados=CARPETA_RESULTADOS,
+                        guardar=True, tolerancia=0.10):
+    """
+    Genera un dataset, ejecuta todos los casos contra los dobles en memoria, guarda los
+    resultados y los compara con la ejecución anterior guardada.
+
+    Parametros:
+        n_usuarios / n_reservas: tamaño del dataset generado
+        repeticiones_carga: ejecuciones medidas de cada caso de carga
+        repeticiones_consulta: ejecuciones medidas de cada consulta
+        semilla: semilla del generador, para que las ejecuciones sean comparables
+        carpeta_resultados: carpeta donde se guardan los resultados
+        guardar: si es False, solo se devuelven los resultados
+        tolerancia: variación a partir de la cual se informa una regresión
+    Retorna:
+        DataFrame con las métricas de cada caso
+    """
+    parametros = {"n_usuarios": n_usuarios, "n_reservas": n_reservas, "semilla": semilla,
+                  "repeticiones_carga": repeticiones_carga, "repeticiones_consulta": repeticiones_consulta}
+
+    with tempfile.TemporaryDirectory() as carpeta:
+        datos = generar_dataset(carpeta, n_usuarios, n_reservas, semilla)
+        visitas = datos["reservas"][["usuario_id", "destino_id"]].to_dict("records")
+
+        metricas = []
+        with clientes_en_memoria({QUERY_VISITAS: visitas}):
+            for caso in armar_casos(datos, carpeta):
+                repeticiones = repeticiones_carga if caso["tipo"] == "carga" else repeticiones_consulta
+                try:
+                    resultado = medir(caso["funcion"], caso["preparar"], repeticiones, caso["filas"])
+                except Exception as e:
+                    # El caso falla sin métricas (no se compara) y se sigue con los demás
+                    metricas.append({"nombre": caso["nombre"], "tipo": caso["tipo"],
+                                     "error": f"{type(e).__name__} - {e}"})
+                    print(f"❌ {caso['nombre']}: {type(e).__name__} - {e}")
+                    continue
+                metricas.append({"nombre": caso["nombre"], "tipo": caso["tipo"], **resultado})
+                print(f"⏱️ {caso['nombre']}: p50 {resultado['p50_ms']:.2f} ms, "
+                      f"p99 {resultado['p99_ms']:.2f} ms, {resultado['memoria_pico_mb']:.1f} MB")
+
+    resultados = pd.DataFrame(metricas).reindex(columns=["nombre", "tipo", "repeticiones", "filas",
+                                                          *METRICAS, "error"])
+    fallidos = resultados["error"].notna().sum()
+    if fallidos:
+        print(f"❌ Fallaron {fallidos} casos.")
+    if not guardar:
+        return resultados
+
+    ruta = guardar_resultados(resultados, parametros, carpeta_resultados)
+    print(f"\n✅ Resultados guardados en {ruta}")
+
+    anterior = ultimos_resultados(carpeta_resultados, excluir=ruta, parametros=parametros)
+    if anterior is not None:
+        comparacion = comparar_resultados(anterior, resultados.set_index("nombre"), tolerancia)
+        regresiones = comparacion[comparacion["regresion"]] if not comparacion.empty else comparacion
+        if regresiones.empty:
+            print(f"✅ Sin regresiones respecto de {anterior.name}.")
+        else:
+            print(f"⚠️ Regresiones respecto de {anterior.name}:")
+            print(regresiones.to_string(index=False))
+    return resultados
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Benchmarks de la capa src contra dobles en memoria.")
+    parser.add_argument("--usuarios", type=int, default=1_000)
+    parser.add_argument("--reservas", type=int, default=2_000)
+    parser.add_argument("--repeticiones-carga", type=int, default=3)
+    parser.add_argument("--repeticiones-consulta", type=int, default=50)
+    parser.add_argument("--semilla", type=int, default=42)
+    parser.add_argument("--no-guardar", action="store_true")
+    argumentos = parser.parse_args()
+
+    resultados = ejecutar_benchmarks(argumentos.usuarios, argumentos.reservas, argumentos.repeticiones_carga,
+                                     argumentos.repeticiones_consulta, argumentos.semilla,
+                                     guardar=not argumentos.no_guardar)
+    sys.exit(1 if resultados["error"].notna().any() else 0)
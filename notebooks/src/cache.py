@@ -0,0 +1,139 @@
+from db_connections import db_redis as r, db_redis_binario as rb
+from src import mongo, redis
+from src.metricas import instrumentar, registrar_cache, registrar_lote
+import time, uuid
+
+# Libera el bloqueo solo si sigue perteneciendo a quien lo tomó
+_LIBERAR_BLOQUEO = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
+#--------------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+#                                               Bloqueo de reconstrucción
+#--------------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+def tomar_bloqueo(clave, ttl_bloqueo=10):
+    """
+    Intenta tomar el bloqueo de reconstrucción de una clave de caché.
+
+    Parametros:
+        clave: clave de caché a reconstruir
+        ttl_bloqueo: segundos tras los cuales el bloqueo se libera solo
+    Retorna:
+        token del bloqueo si se obtuvo, None si otro proceso ya lo tiene
+    """
+    token = uuid.uuid4().hex
+    registrar_lote("redis")
+    if r.set(f"bloqueo:{clave}", token, nx=True, ex=ttl_bloqueo):
+        return token
+    return None
+
+def liberar_bloqueo(clave, token):
+    """
+    Libera el bloqueo de reconstrucción de una clave si todavía es nuestro.
+    """
+    registrar_lote("redis")
+    return r.eval(_LIBERAR_BLOQUEO, 1, f"bloqueo:{clave}", token)
+
+#--------------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+#                                               Consulta con caché
+#--------------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+def _consultar(nombre_base, tipo, filtro, proyeccion, limite):
+    """
+    Consulta MongoDB con el _id como texto, igual que al leer el resultado de la caché.
+    """
+    return redis.normalizar_resultado_cache(list(mongo.obtener_cursor(
+        nombre_base, tipo, limite=limite, filtro=filtro, proyeccion=proyeccion)))
+
+def _consultar_y_guardar(nombre_base, tipo, version, parametros, filtro, proyeccion, limite, ttl):
+    """
+    Consulta MongoDB y guarda el resultado en caché. También se guardan los resultados vacíos
+    y, si el resultado no entra, queda la marca de redis.guardar_en_cache: así quienes esperan
+    el bloqueo encuentran algo en la clave y no vuelven a consultar uno por uno.
+    Se guarda en la versión leída antes de consultar (ver redis.guardar_en_cache).
+    """
+    resultado = _consultar(nombre_base, tipo, filtro, proyeccion, limite)
+    redis.guardar_en_cache(tipo, parametros, resultado, ttl=ttl, version=version)
+    return resultado
+
+@instrumentar("redis")
+def consulta_cacheada(nombre_base, tipo, filtro=None, proyeccion=None, limite=None, ttl=600,
+                      ttl_bloqueo=10, espera_max=5, refresco_anticipado=0.2):
+    """
+    Consulta una colección de MongoDB pasando primero por la caché de Redis (read-through).
+
+    Si la clave no está en caché, solo un proceso la reconstruye (bloqueo en Redis) y el resto
+    espera a que aparezca. Si la clave está por vencer (le queda menos de `refresco_anticipado`
+    de su TTL), quien obtiene el bloqueo la refresca y los demás siguen usando el valor actual.
+
+    Parametros:
+        nombre_base: nombre de la base de datos dentro de mongoDB
+        tipo: colección a consultar ('destinos', 'hoteles', 'actividades')
+        filtro (opcional): filtro para la consulta a la base
+        proyeccion (opcional): campos a proyectar
+        limite (opcional): límite de registros
+        ttl: tiempo de expiración de la búsqueda en caché
+        ttl_bloqueo: tiempo máximo que se retiene el bloqueo de reconstrucción
+        espera_max: segundos que se espera a que otro proceso reconstruya la clave
+        refresco_anticipado: fracción del TTL restante a partir de la cual se refresca
+    Retorna:
+        lista con los resultados de la búsqueda
+    """
+    filtro = filtro or {}
+    # La proyección y el límite cambian el resultado, así que forman parte de la clave
+    parametros = dict(filtro)
+    if proyeccion is not None:
+        parametros["_proyeccion"] = proyeccion
+    if limite is not None:
+        parametros["_limite"] = limite
+    version = redis.obtener_version_cache(tipo)
+    clave = redis.armar_clave_cache(tipo, version, parametros)
+
+    # Valor y TTL restante en un solo viaje (el valor está codificado, ver redis.codificar_cache)
+    with rb.pipeline(transaction=False) as pipe:
+        pipe.get(clave)
+        pipe.ttl(clave)
+        crudo, restante = pipe.execute()
+    registrar_lote("redis")
+    # Un resultado que no se guardó completo se consulta directo, sin esperar el bloqueo
+    if redis.es_resultado_incompleto(crudo):
+        registrar_cache(tipo, False)
+        return _consultar(nombre_base, tipo, filtro, proyeccion, limite)
+    # Si le falta una página se trata como ausente
+    valor = redis.leer_valor_cache(clave, crudo)
+    registrar_cache(tipo, valor is not None)
+
+    if valor is not None:
+        if 0 <= restante < ttl * refresco_anticipado:
+            token = tomar_bloqueo(clave, ttl_bloqueo)
+            if token:
+                try:
+                    return _consultar_y_guardar(nombre_base, tipo, version, parametros, filtro,
+                                                proyeccion, limite, ttl)
+                finally:
+                    liberar_bloqueo(clave, token)
+        return valor
+
+    limite_espera = time.monotonic() + espera_max
+    while True:
+        token = tomar_bloqueo(clave, ttl_bloqueo)
+        if token:
+            try:
+                return _consultar_y_guardar(nombre_base, tipo, version, parametros, filtro,
+                                            proyeccion, limite, ttl)
+            finally:
+                liberar_bloqueo(clave, token)
+
+        # Otro proceso está reconstruyendo la clave: espero a que la publique
+        time.sleep(0.05)
+        crudo = rb.get(clave)
+        registrar_lote("redis")
+        if redis.es_resultado_incompleto(crudo) or time.monotonic() > limite_espera:
+            return _consultar(nombre_base, tipo, filtro, proyeccion, limite)
+        resultado = redis.leer_valor_cache(clave, crudo)
+        if resultado is not None:
+            return resultado
@@ -0,0 +1,224 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from src import mongo, neo4j, recomendaciones, redis, utils
+
+#--------------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+#                                               Carga por bloques
+#--------------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+def cargar_csv_por_bloques(nombre_base, nombre_archivo, nombre_coleccion, tamano_bloque=50000):
+    """
+    Carga un CSV de la carpeta 'fuentes' en MongoDB, Redis y Neo4j leyendo el archivo
+    de a bloques, de modo que la memoria usada no depende del tamaño del archivo.
+
+    Parametros:
+        nombre_base: nombre de la base de datos dentro de mongoDB
+        nombre_archivo: nombre del CSV dentro de 'fuentes' (ej. 'reservas.csv')
+        nombre_coleccion: nombre de la colección de destino (ej. 'reservas')
+        tamano_bloque: cantidad de filas leídas y enviadas por bloque. Por defecto 50000
+    Retorna:
+        cantidad total de filas procesadas
+    """
+    mongo.crear_coleccion(nombre_base, nombre_coleccion, recrear=True)
+    neo4j.crear_esquema_neo4j()
+
+    # Las reservas temporales de todos los bloques se escriben en una versión nueva que se
+    # publica al final: los lectores siguen viendo las anteriores hasta que la carga termina
+    version_reservas = redis.iniciar_recarga_reservas_temporales() if nombre_coleccion == "reservas" else None
+
+    total = 0
+    try:
+        for numero, bloque in enumerate(utils.procesar_csv_por_bloques(nombre_archivo, tamano_bloque)):
+            mongo.insertar_bloque_en_mongo(nombre_base, nombre_coleccion, bloque)
+            redis.insertar_en_redis(nombre_coleccion, bloque, primer_bloque=(numero == 0),
+                                    version_reservas=version_reservas)
+            neo4j.crear_nodos_neo4j(nombre_coleccion, bloque)
+
+            if nombre_coleccion == "reservas":
+                neo4j.crear_relaciones_visito(bloque)
+
+            total += len(bloque)
+    except Exception:
+        # Un bloque fallido (incluido un error al escribir sus reservas temporales en Redis)
+        # descarta la versión en preparación: la vigente sigue siendo la anterior
+        if version_reservas is not None:
+            redis.descartar_reservas_temporales(version_reservas)
+            print(f"⚠️ Se descartaron las reservas temporales de la carga de {nombre_archivo}.")
+        raise
+
+    if version_reservas is not None:
+        redis.publicar_reservas_temporales(version_reservas)
+
+    print(f"✅ Archivo {nombre_archivo} cargado por bloques ({total} filas).")
+    return total
+
+#--------------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+#                                               Carga concurrente
+#--------------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+# Cantidad máxima de tareas simultáneas contra cada base
+LIMITES_POR_BASE = {"mongo": 2, "redis": 2, "neo4j": 1}
+
+def _ejecutar_etapa(semaforo, funcion, *args):
+    """
+    Ejecuta una etapa de la carga respetando el límite de concurrencia de su base
+    y devuelve la duración en segundos.
+    """
+    with semaforo:
+        inicio = time.perf_counter()
+        funcion(*args)
+        return time.perf_counter() - inicio
+
+def armar_etapas(nombre_base, dataframes):
+    """
+    Arma la lista de etapas de la carga a partir de los DataFrames leídos.
+
+    Cada etapa es un diccionario con su nombre, la base a la que escribe, la función a
+    ejecutar con sus argumentos, la cantidad de filas y las etapas de las que depende.
+    Cada base recibe su propia copia del DataFrame porque algunas funciones lo modifican.
+    """
+    etapas = []
+    for nombre_coleccion, df in dataframes.items():
+        etapas.append({
+            "nombre": f"mongo:{nombre_coleccion}", "base": "mongo",
+            "funcion": mongo.insertar_en_mongo, "args": (nombre_base, nombre_coleccion, df.copy()),
+            "filas": len(df), "depende_de": []
+        })
+        if nombre_coleccion in ["usuarios", "reservas"]:
+            etapas.append({
+                "nombre": f"redis:{nombre_coleccion}", "base": "redis",
+                "funcion": redis.insertar_en_redis, "args": (nombre_coleccion, df.copy()),
+                "filas": len(df), "depende_de": []
+            })
+        if nombre_coleccion in ["usuarios", "destinos"]:
+            etapas.append({
+                "nombre": f"neo4j:nodos:{nombre_coleccion}", "base": "neo4j",
+                "funcion": neo4j.crear_nodos_neo4j, "args": (nombre_coleccion, df.copy()),
+                "filas": len(df), "depende_de": []
+            })
+
+    # Las relaciones necesitan que existan los nodos que unen
+    if "reservas" in dataframes:
+        etapas.append({
+            "nombre": "neo4j:relaciones:visito", "base": "neo4j",
+            "funcion": neo4j.crear_relaciones_visito, "args": (dataframes["reservas"].copy(),),
+            "filas": len(dataframes["reservas"]),
+            "depende_de": ["neo4j:nodos:usuarios", "neo4j:nodos:destinos"]
+        })
+    if "usuarios" in dataframes:
+        etapas.append({
+            "nombre": "neo4j:relaciones:usuarios", "base": "neo4j",
+            "funcion": neo4j.crear_relaciones_usuarios, "args": (),
+            "filas": 0, "depende_de": ["neo4j:nodos:usuarios"]
+        })
+
+    # Las recomendaciones se precalculan cuando el grafo está completo. La etapa cuenta para
+    # el límite de Neo4j: la mayor parte de su trabajo son las consultas al grafo
+    if "usuarios" in dataframes:
+        etapas.append({
+            "nombre": "redis:recomendaciones", "base": "neo4j",
+            "funcion": recomendaciones.precalcular_recomendaciones, "args": (),
+            "filas": 0, "depende_de": ["neo4j:relaciones:visito", "neo4j:relaciones:usuarios"]
+        })
+
+    # Solo se esperan dependencias que efectivamente forman parte de la carga
+    nombres = {etapa["nombre"] for etapa in etapas}
+    for etapa in etapas:
+        etapa["depende_de"] = [d for d in etapa["depende_de"] if d in nombres]
+    return etapas
+
+def cargar_en_paralelo(nombre_base, nombre_archivos, nombre_colecciones, max_workers=6, limites=None):
+    """
+    Carga los CSV en MongoDB, Redis y Neo4j ejecutando las escrituras de las tres bases
+    en paralelo sobre un pool de hilos. Las relaciones de Neo4j se crean recién cuando
+    terminaron los nodos que necesitan.
+
+    Parametros:
+        nombre_base: nombre de la base de datos dentro de mongoDB
+        nombre_archivos: lista de CSV dentro de 'fuentes'
+        nombre_colecciones: lista de colecciones, en el mismo orden que los archivos
+        max_workers: cantidad de hilos del pool. Por defecto 6
+        limites (opcional): diccionario base -> tareas simultáneas. Por defecto LIMITES_POR_BASE
+    Retorna:
+        diccionario etapa -> duración en segundos
+    """
+    limites = {**LIMITES_POR_BASE, **(limites or {})}
+    semaforos = {base: threading.Semaphore(limite) for base, limite in limites.items()}
+
+    inicio = time.perf_counter()
+    dataframes = {}
+    for nombre_archivo, nombre_coleccion in zip(nombre_archivos, nombre_colecciones):
+        df = utils.procesar_csv(nombre_archivo)
+        if df is not None:
+            dataframes[nombre_coleccion] = df
+
+    neo4j.crear_esquema_neo4j()
+    pendientes = {etapa["nombre"]: etapa for etapa in armar_etapas(nombre_base, dataframes)}
+    terminadas = {}
+    en_curso = {}
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        while pendientes or en_curso:
+            # Lanzo todas las etapas cuyas dependencias ya terminaron
+            for nombre, etapa in list(pendientes.items()):
+                if all(d in terminadas for d in etapa["depende_de"]):
+                    futuro = pool.submit(_ejecutar_etapa, semaforos[etapa["base"]],
+                                         etapa["funcion"], *etapa["args"])
+                    en_curso[futuro] = pendientes.pop(nombre)
+
+            listos, _ = wait(en_curso, return_when=FIRST_COMPLETED)
+            for futuro in listos:
+                etapa = en_curso.pop(futuro)
+                terminadas[etapa["nombre"]] = futuro.result()
+                print(f"⏱️ {etapa['nombre']}: {etapa['filas']} filas en {terminadas[etapa['nombre']]:.2f}s")
+
+    duracion = time.perf_counter() - inicio
+    filas = sum(len(df) for df in dataframes.values())
+    velocidad = filas / duracion if duracion > 0 else float(filas)
+    print(f"\n🚀 Carga concurrente completada: {filas} filas en {duracion:.2f}s ({velocidad:.0f} filas/s).")
+    return terminadas
+
+#--------------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+#                                               Carga incremental
+#--------------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+def cargar_incremental(nombre_base, nombre_archivos, nombre_colecciones):
+    """
+    Refresca las tres bases aplicando solo las diferencias con la carga anterior, sin borrar
+    ni recrear nada. Cada fila se identifica por su clave (ver mongo.CLAVES_COLECCIONES) y se
+    compara su huella con la guardada: las nuevas o modificadas se hacen upsert y las que
+    desaparecieron de la fuente se eliminan. El tiempo depende de cuánto cambió, no del total.
+
+    Parametros:
+        nombre_base: nombre de la base de datos dentro de mongoDB
+        nombre_archivos: lista de CSV dentro de 'fuentes'
+        nombre_colecciones: lista de colecciones, en el mismo orden que los archivos
+    Retorna:
+        diccionario colección -> (filas cambiadas, filas eliminadas)
+    """
+    neo4j.crear_esquema_neo4j()
+    resumen = {}
+
+    for nombre_archivo, nombre_coleccion in zip(nombre_archivos, nombre_colecciones):
+        df = utils.procesar_csv(nombre_archivo)
+        if df is None:
+            continue
+
+        cambios = mongo.calcular_cambios(nombre_base, nombre_coleccion, df)
+        resumen[nombre_coleccion] = (len(cambios["cambios"]), len(cambios["eliminados"]))
+        if cambios["cambios"].empty and not cambios["eliminados"]:
+            print(f"✅ {nombre_coleccion}: sin cambios.")
+            continue
+
+        mongo.aplicar_cambios_mongo(nombre_base, nombre_coleccion, cambios)
+        redis.aplicar_cambios_redis(nombre_coleccion, cambios)
+        neo4j.aplicar_cambios_neo4j(nombre_coleccion, cambios)
+        # Las huellas se guardan al final para que un fallo intermedio se reintente en la próxima carga
+        mongo.guardar_huellas(nombre_base, nombre_coleccion, cambios)
+
+        print(f"✅ {nombre_coleccion}: {resumen[nombre_coleccion][0]} filas nuevas o modificadas, "
+              f"{resumen[nombre_coleccion][1]} eliminadas.")
+
+    return resumen
+
@@ -0,0 +1,292 @@
+import contextlib
+import contextvars
+import functools
+import inspect
+import os
+import threading
+import time
+
+import pandas as pd
+
+from db_connections import registrar_escucha_mongo
+
+# Instrumentación opcional de las operaciones contra las bases. Por defecto está apagada y
+# las funciones instrumentadas solo pagan una comprobación de un booleano por llamada.
+# Se activa de dos formas, que pueden usarse a la vez:
+#   - habilitar_metricas(puerto): publica las métricas con prometheus_client
+#     (también con las variables de entorno METRICAS_HABILITADAS=1 y METRICAS_PUERTO).
+#   - with perfilar(): acumula las métricas en memoria durante el bloque y muestra un resumen.
+#
+# Por cada base ('mongo', 'neo4j', 'redis') y operación se registran las llamadas, la latencia,
+# los viajes al servidor y las filas (documentos, nodos, claves) enviadas o recibidas. Solo se
+# registra la operación instrumentada más externa: las que se llaman desde otra no se cuentan
+# aparte (su latencia ya está incluida) y sus viajes y filas se atribuyen a la externa.
+
+_prometheus = None
+_colectores = None
+_puertos_servidos = set()
+_perfiles = []
+_activo = False
+_bloqueo = threading.Lock()
+_operacion_actual = contextvars.ContextVar("operacion_actual", default="-")
+
+# Límites del histograma de latencias, en segundos
+LIMITES_LATENCIA = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+#--------------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+#                                               Activación
+#--------------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+def _actualizar_activo():
+    global _activo
+    _activo = _prometheus is not None or bool(_perfiles)
+
+def _crear_colectores():
+    from prometheus_client import Counter, Histogram
+
+    return {
+        "llamadas": Counter("basedatos_llamadas_total", "Llamadas a operaciones contra las bases",
+                            ["base", "operacion"]),
+        "latencia": Histogram("basedatos_latencia_segundos", "Latencia de las operaciones",
+                              ["base", "operacion"], buckets=LIMITES_LATENCIA),
+        "viajes": Counter("basedatos_viajes_total", "Viajes al servidor (comandos, pipelines, transacciones)",
+                          ["base", "operacion"]),
+        "filas": Counter("basedatos_filas_total", "Documentos, nodos o claves enviados o recibidos",
+                         ["base", "operacion"]),
+        "cache": Counter("cache_busquedas_total", "Búsquedas en la caché de Redis",
+                         ["tipo", "resultado"]),
+    }
+
+def habilitar_metricas(puerto=None):
+    """
+    Empieza a registrar las métricas en Prometheus. Las métricas se crean (y registran en
+    prometheus_client) la primera vez y se reutilizan si se vuelve a habilitar.
+
+    Parametros:
+        puerto (opcional): si se indica, levanta un servidor HTTP que expone /metrics en ese puerto
+    Retorna:
+        diccionario nombre -> métrica de prometheus_client
+    """
+    global _prometheus, _colectores
+    from prometheus_client import start_http_server
+
+    with _bloqueo:
+        if _colectores is None:
+            _colectores = _crear_colectores()
+        _prometheus = _colectores
+        # El servidor de cada puerto sigue activo aunque se deshabiliten las métricas
+        if puerto and int(puerto) not in _puertos_servidos:
+            start_http_server(int(puerto))
+            _puertos_servidos.add(int(puerto))
+            print(f"✅ Métricas disponibles en http://localhost:{puerto}/metrics")
+        _actualizar_activo()
+    return _prometheus
+
+def deshabilitar_metricas():
+    """
+    Deja de registrar métricas en Prometheus. Las ya creadas siguen registradas en
+    prometheus_client (con sus valores) y se reutilizan al volver a habilitarlas.
+    """
+    global _prometheus
+    with _bloqueo:
+        _prometheus = None
+        _actualizar_activo()
+
+def metricas_activas():
+    """Indica si hay algún destino (Prometheus o un perfil) registrando métricas."""
+    return _activo
+
+#--------------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+#                                               Registro
+#--------------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+def _registrar_llamada(base, operacion, segundos):
+    if _prometheus is not None:
+        _prometheus["llamadas"].labels(base, operacion).inc()
+        _prometheus["latencia"].labels(base, operacion).observe(segundos)
+    if _perfiles:
+        with _bloqueo:
+            for perfil in _perfiles:
+                datos = perfil._datos(base, operacion)
+                datos["llamadas"] += 1
+                datos["segundos"] += segundos
+                datos["maximo_ms"] = max(datos["maximo_ms"], segundos * 1000)
+
+def registrar_lote(base, filas=0, viajes=1):
+    """
+    Registra viajes al servidor y filas movidas, atribuidos a la operación instrumentada en curso.
+    Se llama una vez por lote, pipeline o transacción.
+    """
+    if not _activo:
+        return
+    operacion = _operacion_actual.get()
+    if _prometheus is not None:
+        if viajes:
+            _prometheus["viajes"].labels(base, operacion).inc(viajes)
+        if filas:
+            _prometheus["filas"].labels(base, operacion).inc(filas)
+    if _perfiles:
+        with _bloqueo:
+            for perfil in _perfiles:
+                datos = perfil._datos(base, operacion)
+                datos["viajes"] += viajes
+                datos["filas"] += filas
+
+def registrar_cache(tipo, acierto):
+    """
+    Registra una búsqueda en la caché de Redis como acierto (hit) o fallo (miss).
+    """
+    if not _activo:
+        return
+    resultado = "hit" if acierto else "miss"
+    if _prometheus is not None:
+        _prometheus["cache"].labels(tipo, resultado).inc()
+    if _perfiles:
+        with _bloqueo:
+            for perfil in _perfiles:
+                perfil.cache.setdefault(tipo, {"hit": 0, "miss": 0})[resultado] += 1
+
+def _cantidad(resultado):
+    try:
+        return len(resultado)
+    except TypeError:
+        return 0
+
+def instrumentar(base, operacion=None, contar_resultado=False):
+    """
+    Decorador que registra llamadas y latencia de una función (sincrónica o async). Si se
+    llama desde otra función instrumentada no registra nada aparte, para no contarla dos veces.
+
+    Parametros:
+        base: base contra la que trabaja la función ('mongo', 'neo4j', 'redis')
+        operacion (opcional): nombre de la operación. Por defecto el nombre de la función
+        contar_resultado: si es True, el largo del resultado se suma como filas recibidas
+    """
+    def decorador(funcion):
+        nombre = operacion or funcion.__name__
+
+        if inspect.iscoroutinefunction(funcion):
+            @functools.wraps(funcion)
+            async def envoltura_async(*args, **kwargs):
+                if not _activo or _operacion_actual.get() != "-":
+                    return await funcion(*args, **kwargs)
+                token = _operacion_actual.set(nombre)
+                inicio = time.perf_counter()
+                try:
+                    resultado = await funcion(*args, **kwargs)
+                    if contar_resultado:
+                        registrar_lote(base, filas=_cantidad(resultado), viajes=0)
+                    return resultado
+                finally:
+                    _operacion_actual.reset(token)
+                    _registrar_llamada(base, nombre, time.perf_counter() - inicio)
+            return envoltura_async
+
+        @functools.wraps(funcion)
+        def envoltura(*args, **kwargs):
+            if not _activo or _operacion_actual.get() != "-":
+                return funcion(*args, **kwargs)
+            token = _operacion_actual.set(nombre)
+            inicio = time.perf_counter()
+            try:
+                resultado = funcion(*args, **kwargs)
+                if contar_resultado:
+                    registrar_lote(base, filas=_cantidad(resultado), viajes=0)
+                return resultado
+            finally:
+                _operacion_actual.reset(token)
+                _registrar_llamada(base, nombre, time.perf_counter() - inicio)
+        return envoltura
+    return decorador
+
+def escucha_mongo():
+    """
+    Devuelve un CommandListener de pymongo que cuenta cada comando enviado a MongoDB como un
+    viaje de la operación en curso y registra su duración como operación 'comando:<nombre>'.
+    """
+    from pymongo import monitoring
+
+    class _EscuchaMongo(monitoring.CommandListener):
+        def started(self, evento):
+            pass
+
+        def succeeded(self, evento):
+            if _activo:
+                registrar_lote("mongo")
+                _registrar_llamada("mongo", f"comando:{evento.command_name}", evento.duration_micros / 1e6)
+
+        def failed(self, evento):
+            self.succeeded(evento)
+
+    return _EscuchaMongo()
+
+#--------------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+#                                               Perfil
+#--------------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+class Perfil:
+    """
+    Métricas acumuladas en memoria mientras está activo un bloque perfilar().
+    """
+    def __init__(self):
+        self.operaciones = {}
+        self.cache = {}
+
+    def _datos(self, base, operacion):
+        clave = (base, operacion)
+        if clave not in self.operaciones:
+            self.operaciones[clave] = {"llamadas": 0, "segundos": 0.0, "maximo_ms": 0.0, "viajes": 0, "filas": 0}
+        return self.operaciones[clave]
+
+    def resumen(self):
+        """
+        Devuelve un DataFrame con una fila por base y operación, ordenado por tiempo total.
+        """
+        filas = [{"base": base, "operacion": operacion, **datos}
+                 for (base, operacion), datos in self.operaciones.items()]
+        if not filas:
+            return pd.DataFrame()
+        df = pd.DataFrame(filas)
+        df["promedio_ms"] = (df["segundos"] * 1000 / df["llamadas"].where(df["llamadas"] > 0)).round(3)
+        return df.sort_values("segundos", ascending=False, ignore_index=True)
+
+    def mostrar(self):
+        df = self.resumen()
+        if df.empty:
+            print("⚠️ No se registraron operaciones.")
+        else:
+            print(df.to_string(index=False))
+        for tipo, conteo in self.cache.items():
+            total = conteo["hit"] + conteo["miss"]
+            print(f"🗃️ Caché {tipo}: {conteo['hit']}/{total} aciertos ({conteo['hit'] / total:.0%})")
+
+@contextlib.contextmanager
+def perfilar(mostrar=True):
+    """
+    Registra las operaciones ejecutadas dentro del bloque (en cualquier hilo) y, al salir,
+    muestra un resumen por base y operación.
+
+    Ejemplo:
+        with metricas.perfilar() as perfil:
+            carga.cargar_en_paralelo("clase", archivos, colecciones)
+        perfil.resumen()
+    """
+    perfil = Perfil()
+    with _bloqueo:
+        _perfiles.append(perfil)
+        _actualizar_activo()
+    try:
+        yield perfil
+    finally:
+        with _bloqueo:
+            _perfiles.remove(perfil)
+            _actualizar_activo()
+        if mostrar:
+            perfil.mostrar()
+
+
+# Los clientes de MongoDB cuentan cada comando como un viaje cuando las métricas están activas
+registrar_escucha_mongo(escucha_mongo())
+
+if os.getenv("METRICAS_HABILITADAS", "0") == "1":
+    habilitar_metricas(os.getenv("METRICAS_PUERTO"))
@@ -1,17 +1,131 @@
 from db_connections import client
-from src.utils import lectura_csv
+from src.utils import lectura_csv, dividir_en_lotes, texto_a_lista
+from src import redis
+from src.metricas import instrumentar, registrar_lote
 from pprint import pprint
+from pymongo import ASCENDING, IndexModel, UpdateOne, ReplaceOne, DeleteMany
+from pymongo.errors import BulkWriteError
+from collections import Counter
+import threading
 import pandas as pd
-import ast
+
+# Campo que identifica a cada fila de las fuentes, usado en la carga incremental
+CLAVES_COLECCIONES = {
+    "usuarios": "usuario_id",
+    "destinos": "destino_id",
+    "hoteles": "hotel_id",
+    "actividades": "actividad_id",
+    "reservas": "reserva_id",
+}
+
+# Índices de cada colección. Se crean al crear o recrear la colección (ver crear_indices).
+# Un índice sobre un campo lista (ej. 'servicios') es multikey automáticamente.
+INDICES_COLECCIONES = {
+    "usuarios": [
+        IndexModel([("usuario_id", ASCENDING)], unique=True),
+    ],
+    "destinos": [
+        IndexModel([("destino_id", ASCENDING)], unique=True),
+        IndexModel([("ciudad", ASCENDING)]),
+        IndexModel([("tipo", ASCENDING), ("ciudad", ASCENDING)]),
+        IndexModel([("precio_promedio", ASCENDING)]),
+    ],
+    "hoteles": [
+        IndexModel([("hotel_id", ASCENDING)], unique=True),
+        IndexModel([("ciudad", ASCENDING), ("nombre", ASCENDING)]),
+        IndexModel([("provincia", ASCENDING), ("ciudad", ASCENDING)]),
+        IndexModel([("nombre", ASCENDING)]),
+        IndexModel([("servicios", ASCENDING)]),
+    ],
+    "actividades": [
+        IndexModel([("actividad_id", ASCENDING)], unique=True),
+        IndexModel([("ciudad", ASCENDING), ("tipo", ASCENDING)]),
+        IndexModel([("tipo", ASCENDING)]),
+    ],
+    "reservas": [
+        IndexModel([("reserva_id", ASCENDING)], unique=True),
+        IndexModel([("usuario_id", ASCENDING)]),
+        IndexModel([("destino_id", ASCENDING)]),
+        IndexModel([("estado", ASCENDING)]),
+    ],
+}
+
+# Campos por los que se mantienen conteos materializados (colección 'resumen_<coleccion>').
+# contador() los usa directamente cuando se agrupa por uno de ellos sin filtro.
+RESUMENES_COLECCIONES = {
+    "reservas": ["estado", "destino_id", "hotel_id", "usuario_id"],
+}
+
+# Tipos de columna usados por obtener_dataframe (enteros nullable para tolerar faltantes)
+ESQUEMAS_COLECCIONES = {
+    "reservas": {
+        "reserva_id": "Int64",
+        "usuario_id": "Int64",
+        "destino_id": "Int64",
+        "hotel_id": "Int64",
+        "fecha_reserva": "string",
+        "estado": "category",
+        "precio_total": "Int64",
+    },
+}
+
+# Consultas habituales de los notebooks, usadas para revisar sus planes de ejecución
+CONSULTAS_ESTANDAR = [
+    ("hoteles", {"ciudad": "La Plata"}),
+    ("hoteles", {"nombre": "Familia Galiano S.L. Hotel"}),
+    ("hoteles", {"ciudad": {"$in": ["Bariloche", "Ushuaia"]}}),
+    ("hoteles", {"provincia": "Córdoba"}),
+    ("hoteles", {"servicios": "spa"}),
+    ("destinos", {"tipo": "Playa", "ciudad": "La Rioja"}),
+    ("destinos", {"precio_promedio": {"$lt": 100000}}),
+    ("actividades", {"tipo": "relax"}),
+    ("actividades", {"ciudad": "Ushuaia", "tipo": "aventura"}),
+]
 
 #--------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------
 #                                                             ALTA Y CARGA MONGO
 #--------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------
 
 
+# Catálogo local de colecciones por base: evita consultar list_collection_names() en cada lectura.
+# Se actualiza con nuestras funciones de alta y baja; ante un nombre desconocido se vuelve a leer del servidor.
+# Lo usan a la vez los hilos de carga.cargar_en_paralelo, por eso todo acceso pasa por el bloqueo.
+_catalogo_colecciones = {}
+_bloqueo_catalogo = threading.Lock()
+
+def invalidar_catalogo(nombre_base=None):
+    """
+    Descarta el catálogo local de colecciones de una base (o de todas si es None).
+    Usar si las colecciones se modifican por fuera de este módulo.
+    """
+    with _bloqueo_catalogo:
+        if nombre_base is None:
+            _catalogo_colecciones.clear()
+        else:
+            _catalogo_colecciones.pop(nombre_base, None)
+
+def _en_catalogo(nombre_base, nombre_coleccion):
+    with _bloqueo_catalogo:
+        return nombre_coleccion in _catalogo_colecciones.get(nombre_base, ())
+
+def _reemplazar_catalogo(nombre_base, colecciones):
+    with _bloqueo_catalogo:
+        _catalogo_colecciones[nombre_base] = set(colecciones)
+
+def _agregar_al_catalogo(nombre_base, nombre_coleccion):
+    with _bloqueo_catalogo:
+        _catalogo_colecciones.setdefault(nombre_base, set()).add(nombre_coleccion)
+
+def _quitar_del_catalogo(nombre_base, *nombres):
+    with _bloqueo_catalogo:
+        colecciones = _catalogo_colecciones.get(nombre_base)
+        if colecciones is not None:
+            colecciones.difference_update(nombres)
+
 def coleccion_existe(db, nombre_coleccion):
     """
     Verifica si una colección existe en la base de datos.
+    Usa el catálogo local y solo consulta al servidor si la colección no figura en él.
 
     Parámetros:
     - db: objeto pymongo.database.Database
@@ -20,7 +134,19 @@ def coleccion_existe(db, nombre_coleccion):
     Retorna:
     - True si existe, False si no
     """
-    return nombre_coleccion in db.list_collection_names()  
+    if _en_catalogo(db.name, nombre_coleccion):
+        return True
+
+    colecciones = set(db.list_collection_names())
+    _reemplazar_catalogo(db.name, colecciones)
+    return nombre_coleccion in colecciones
+
+def eliminar_base(nombre_base):
+    """
+    Elimina una base de datos de MongoDB y la quita del catálogo local.
+    """
+    client.drop_database(nombre_base)
+    invalidar_catalogo(nombre_base)
 
 def obtener_coleccion(nombre_base, nombre_coleccion):
     """
@@ -36,6 +162,7 @@ def obtener_coleccion(nombre_base, nombre_coleccion):
             f"La colección '{nombre_coleccion}' no existe en la base '{nombre_base}'.")
     return db[nombre_coleccion]
 
+@instrumentar("mongo")
 def crear_coleccion(nombre_base, nombre_coleccion, recrear=False):
     """
     Crea una colección dentro de la base de datos especificada.
@@ -52,12 +179,37 @@ def crear_coleccion(nombre_base, nombre_coleccion, recrear=False):
     if coleccion_existe(db, nombre_coleccion):
         if recrear:
             db.drop_collection(nombre_coleccion)
+            db.drop_collection(f"resumen_{nombre_coleccion}")
+            # Una recarga completa invalida las huellas de la carga incremental
+            db.drop_collection(f"huellas_{nombre_coleccion}")
+            _quitar_del_catalogo(nombre_base, nombre_coleccion, f"resumen_{nombre_coleccion}",
+                                 f"huellas_{nombre_coleccion}")
+            redis.invalidar_cache(nombre_coleccion)
         else:
             return db[nombre_coleccion]
 
     coleccion = db.create_collection(nombre_coleccion)
+    _agregar_al_catalogo(nombre_base, nombre_coleccion)
+    crear_indices(nombre_base, nombre_coleccion)
     return coleccion
 
+def crear_indices(nombre_base, nombre_coleccion):
+    """
+    Crea los índices definidos en INDICES_COLECCIONES para una colección.
+    Si ya existen no hace nada, por lo que se puede ejecutar varias veces.
+
+    Parametros:
+        nombre_base: nombre de la base de datos dentro de mongoDB
+        nombre_coleccion: nombre de la colección
+    Retorna:
+        lista con los nombres de los índices
+    """
+    indices = INDICES_COLECCIONES.get(nombre_coleccion)
+    if not indices:
+        return []
+    return client[nombre_base][nombre_coleccion].create_indexes(indices)
+
+@instrumentar("mongo")
 def insertar_muchos_coleccion(nombre_base, nombre_coleccion, datos, ordenado=False):
     """
     Inserta varios documentos en una colección.
@@ -81,12 +233,74 @@ def insertar_muchos_coleccion(nombre_base, nombre_coleccion, datos, ordenado=Fal
 
     try:
         resultado = coleccion.insert_many(lista_datos, ordered=ordenado)
+        insertados = lista_datos
         print(f"✅ Se insertaron {len(resultado.inserted_ids)} documentos en '{coleccion.name}'.")
-        return resultado
-        
+
+    except BulkWriteError as e:
+        # Con errores parciales (ej. claves duplicadas) igual se insertó una parte de los documentos
+        errores = e.details.get("writeErrors", [])
+        fallidos = {error["index"] for error in errores}
+        if ordenado:
+            insertados = lista_datos[:min(fallidos, default=len(lista_datos))]
+        else:
+            insertados = [doc for i, doc in enumerate(lista_datos) if i not in fallidos]
+        resultado = None
+        detalle = errores[0]["errmsg"] if errores else e
+        print(f"❌ Se insertaron {len(insertados)} de {len(lista_datos)} documentos en '{coleccion.name}' "
+              f"({len(fallidos)} con error: {detalle})")
+
     except Exception as e:
         print(f"❌ Error inesperado: {type(e).__name__} - {e}")
+        return None
+
+    # Fuera del manejo de errores del insert: un fallo aquí no es un fallo de la inserción
+    registrar_lote("mongo", filas=len(insertados), viajes=0)
+    if insertados:
+        # Las búsquedas cacheadas de esta colección quedaron desactualizadas
+        redis.invalidar_cache(nombre_coleccion)
+        actualizar_resumen(nombre_base, nombre_coleccion, insertados)
+    return resultado
+
+def limpiar_df(nombre_coleccion, df):
+    """
+    Aplica a un DataFrame (o a un bloque de un CSV) las transformaciones
+    necesarias antes de guardarlo en MongoDB.
+
+    Parametros:
+        nombre_coleccion: nombre de la colección a la que pertenecen los datos.
+        df: dataFrame con los datos a limpiar
+    Retorna:
+        DataFrame listo para insertar
+    """
+    if nombre_coleccion == "hoteles" and not df.empty and isinstance(df["servicios"].iloc[0], str):
+        #Se convierten los servicios en una lista para que no se guarde como string
+        #(los DataFrames de utils.leer_fuente ya traen listas y no pasan por aquí)
+        df["servicios"] = df["servicios"].map(texto_a_lista)
+
+    # Si es reservas, se filtran solo las que tienen estado
+    if nombre_coleccion == "reservas":
+        df = df[df["estado"].notna() & (df["estado"].astype(str).str.strip() != "")]
+        # En MongoDB la fecha se sigue guardando como texto (ver ESQUEMAS_COLECCIONES)
+        if pd.api.types.is_datetime64_any_dtype(df["fecha_reserva"]):
+            df = df.assign(fecha_reserva=df["fecha_reserva"].dt.strftime("%Y-%m-%d"))
+
+    return df
+
+@instrumentar("mongo")
+def insertar_bloque_en_mongo(nombre_base, nombre_coleccion, df):
+    """
+    Limpia e inserta un bloque de datos en una colección existente de MongoDB,
+    sin recrearla.
+
+    Parametros:
+        nombre_base: nombre de la base de datos dentro de mongoDB
+        nombre_coleccion: nombre de la colección a ingresar los datos.
+        df: dataFrame con el bloque de datos a insertar
+    """
+    df_limpio = limpiar_df(nombre_coleccion, df)
+    return insertar_muchos_coleccion(nombre_base, nombre_coleccion, df_limpio.to_dict("records"))
 
+@instrumentar("mongo")
 def insertar_en_mongo(nombre_base, nombre_coleccion, df):
     """
     Crea e inserta datos en una colección de MongoDB.
@@ -97,20 +311,7 @@ def insertar_en_mongo(nombre_base, nombre_coleccion, df):
         df: dataFrame con los datos a insertar
     """
     crear_coleccion(nombre_base, nombre_coleccion, recrear=True)
-    
-    if nombre_coleccion == "hoteles":
-        #Se convierten los servicios en una lista para que no se guarde como string
-        df["servicios"] = df["servicios"].apply(
-                lambda x: ast.literal_eval(x) if isinstance(x, str) and x.startswith("[") else x)
-
-    filas = df.to_dict(orient="records")
-
-    # Si es reservas, se filtran solo las que tienen estado
-    if nombre_coleccion == "reservas":
-        df_filtrado = df[df["estado"].notna() & (df["estado"].astype(str).str.strip() != "")]
-        insertar_muchos_coleccion(nombre_base, nombre_coleccion, df_filtrado.to_dict("records"))
-    else:
-        insertar_muchos_coleccion(nombre_base, nombre_coleccion, filas)
+    insertar_bloque_en_mongo(nombre_base, nombre_coleccion, df)
 
     print(f"✅ Colección {nombre_coleccion} creada e insertada en MongoDB.")
 
@@ -134,6 +335,113 @@ def cargar_df_a_coleccion(df, nombre_base, nombre_coleccion,ordenado=False):
     return insertar_muchos_coleccion(nombre_base, nombre_coleccion, datos, ordenado)
 
 
+#-----------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+#                                                             CARGA INCREMENTAL
+#-----------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+def calcular_huellas(df):
+    """
+    Calcula una huella (hash de 64 bits) por fila de un DataFrame, de forma vectorizada.
+    """
+    return pd.util.hash_pandas_object(df.astype(str), index=False).to_numpy().view("int64")
+
+@instrumentar("mongo")
+def calcular_cambios(nombre_base, nombre_coleccion, df):
+    """
+    Compara las filas de una fuente con las huellas guardadas en la última carga
+    (colección 'huellas_<coleccion>') y devuelve solo lo que cambió.
+
+    Parametros:
+        nombre_base: nombre de la base de datos dentro de mongoDB
+        nombre_coleccion: nombre de la colección (define la clave, ver CLAVES_COLECCIONES)
+        df: DataFrame con el contenido actual de la fuente
+    Retorna:
+        diccionario con 'cambios' (DataFrame de filas nuevas o modificadas),
+        'eliminados' (lista de claves que ya no están en la fuente) y 'huellas' (de las filas cambiadas)
+    """
+    clave = CLAVES_COLECCIONES[nombre_coleccion]
+    db = client[nombre_base]
+    nombre_huellas = f"huellas_{nombre_coleccion}"
+
+    ids, huellas = [], []
+    if coleccion_existe(db, nombre_huellas):
+        for doc in db[nombre_huellas].find({}).batch_size(10000):
+            ids.append(doc["_id"])
+            huellas.append(doc["huella"])
+    actual = pd.DataFrame({"_id": df[clave].to_numpy(), "huella": calcular_huellas(df)})
+    previo = pd.DataFrame({
+        "_id": pd.Series(ids, dtype=actual["_id"].dtype),
+        "huella_previa": pd.array(huellas, dtype="Int64")
+    })
+    cruce = actual.merge(previo, on="_id", how="left")
+    cambiados = (cruce["huella_previa"] != cruce["huella"]).fillna(True).to_numpy(dtype=bool)
+
+    return {
+        "cambios": df[cambiados],
+        "eliminados": previo.loc[~previo["_id"].isin(actual["_id"]), "_id"].tolist(),
+        "huellas": actual[cambiados],
+    }
+
+@instrumentar("mongo")
+def aplicar_cambios_mongo(nombre_base, nombre_coleccion, cambios, tamano_lote=5000):
+    """
+    Aplica en MongoDB los cambios de calcular_cambios con bulk_write: upsert de las filas
+    nuevas o modificadas y borrado de las eliminadas (o que ya no pasan la limpieza).
+    El resumen materializado se ajusta con la diferencia entre los documentos previos
+    de esas filas y los nuevos, sin recalcularlo.
+
+    Retorna:
+        cantidad de operaciones enviadas
+    """
+    clave = CLAVES_COLECCIONES[nombre_coleccion]
+    crear_coleccion(nombre_base, nombre_coleccion)
+    coleccion = client[nombre_base][nombre_coleccion]
+
+    df_limpio = limpiar_df(nombre_coleccion, cambios["cambios"].copy())
+    documentos = df_limpio.to_dict("records")
+    operaciones = [ReplaceOne({clave: doc[clave]}, doc, upsert=True) for doc in documentos]
+
+    # Valores previos de las filas que se reemplazan o borran, para restarlos del resumen
+    campos_resumen = RESUMENES_COLECCIONES.get(nombre_coleccion)
+    previos = []
+    if campos_resumen:
+        afectados = cambios["cambios"][clave].tolist() + list(cambios["eliminados"])
+        proyeccion = {"_id": 0, **{campo: 1 for campo in campos_resumen}}
+        for lote in dividir_en_lotes(afectados, tamano_lote):
+            previos.extend(coleccion.find({clave: {"$in": lote}}, proyeccion))
+
+    # Filas que dejaron de cumplir la limpieza (ej. reservas que quedaron sin estado)
+    descartados = set(cambios["cambios"][clave].tolist()) - set(df_limpio[clave].tolist())
+    borrar = list(descartados) + list(cambios["eliminados"])
+    operaciones += [DeleteMany({clave: {"$in": lote}}) for lote in dividir_en_lotes(borrar, tamano_lote)]
+
+    for lote in dividir_en_lotes(operaciones, tamano_lote):
+        coleccion.bulk_write(lote, ordered=False)
+        registrar_lote("mongo", filas=len(lote), viajes=0)
+
+    if operaciones:
+        redis.invalidar_cache(nombre_coleccion)
+        actualizar_resumen(nombre_base, nombre_coleccion, documentos, previos)
+    return len(operaciones)
+
+@instrumentar("mongo")
+def guardar_huellas(nombre_base, nombre_coleccion, cambios, tamano_lote=5000):
+    """
+    Guarda las huellas de las filas cambiadas y borra las de las eliminadas,
+    una vez aplicados los cambios en todas las bases.
+    """
+    coleccion = client[nombre_base][f"huellas_{nombre_coleccion}"]
+    operaciones = [
+        UpdateOne({"_id": id_}, {"$set": {"huella": huella}}, upsert=True)
+        for id_, huella in zip(cambios["huellas"]["_id"].tolist(), cambios["huellas"]["huella"].tolist())
+    ]
+    operaciones += [DeleteMany({"_id": {"$in": lote}})
+                    for lote in dividir_en_lotes(cambios["eliminados"], tamano_lote)]
+
+    for lote in dividir_en_lotes(operaciones, tamano_lote):
+        coleccion.bulk_write(lote, ordered=False)
+        registrar_lote("mongo", filas=len(lote), viajes=0)
+
 #-----------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------
 #                                                             CONSULTAS
 #-----------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------
@@ -163,13 +471,83 @@ def obtener_cursor(nombre_base, nombre_coleccion, limite=None, filtro=None, proy
         cursor = cursor.limit(limite)
     return cursor   
 
-def contar_documentos(nombre_base, nombre_coleccion):
+@instrumentar("mongo", contar_resultado=True)
+def obtener_dataframe(nombre_base, nombre_coleccion, filtro=None, proyeccion=None,
+                      esquema=None, batch_size=10000, limite=None):
+    """
+    Lee una consulta directamente a un DataFrame por columnas, en lugar de
+    pd.DataFrame(list(cursor)). Los documentos se traen de a `batch_size` y cada lote
+    se vuelca a columnas tipadas, de modo que nunca se guarda la lista completa de diccionarios.
+
+    Parametros:
+        nombre_base: nombre de la base de datos dentro de mongoDB
+        nombre_colección: colección de la cual se quieren obtener datos
+        filtro (opcional): filtro para la consulta a la base.
+        proyeccion (opcional): campos a proyectar. Si no se indica, se proyectan los del esquema.
+        esquema (opcional): diccionario campo -> dtype de pandas. Por defecto ESQUEMAS_COLECCIONES.
+        batch_size: documentos pedidos al servidor por viaje y volcados por lote
+        limite (opcional): limite de registros que desean obtener.
+    Retorna:
+        pd.DataFrame con una columna por campo
+    """
+    if esquema is None and proyeccion is None:
+        esquema = ESQUEMAS_COLECCIONES.get(nombre_coleccion)
+    esquema = esquema or {}
+
+    campos = list(esquema) or [c for c, v in (proyeccion or {}).items() if v and c != "_id"]
+    if campos and proyeccion is None:
+        proyeccion = {"_id": 0, **{c: 1 for c in campos}}
+
+    cursor = obtener_cursor(nombre_base, nombre_coleccion, limite=limite,
+                            filtro=filtro, proyeccion=proyeccion).batch_size(batch_size)
+
+    bloques = {c: [] for c in campos}
+    valores = {c: [] for c in campos}
+    pendientes = 0
+
+    def volcar():
+        # Las categorías se arman al final para que todos los lotes compartan las mismas
+        for campo in campos:
+            tipo = esquema.get(campo)
+            tipo = "string" if tipo == "category" else tipo
+            bloques[campo].append(pd.Series(valores[campo], dtype=tipo))
+            valores[campo] = []
+
+    for documento in cursor:
+        if not campos:
+            # Sin esquema ni proyección, las columnas salen del primer documento
+            campos = [c for c in documento if c != "_id"]
+            bloques = {c: [] for c in campos}
+            valores = {c: [] for c in campos}
+        for campo in campos:
+            valores[campo].append(documento.get(campo))
+        pendientes += 1
+        if pendientes == batch_size:
+            volcar()
+            pendientes = 0
+
+    if pendientes:
+        volcar()
+
+    df = pd.DataFrame({
+        campo: pd.concat(bloques[campo], ignore_index=True) if bloques[campo] else pd.Series(dtype=esquema.get(campo))
+        for campo in campos
+    })
+    for campo, tipo in esquema.items():
+        if tipo == "category" and campo in df:
+            df[campo] = df[campo].astype("category")
+    return df
+
+@instrumentar("mongo")
+def contar_documentos(nombre_base, nombre_coleccion, estimado=False):
     """
     Devuelve la cantidad de documentos de una coleccion
 
     Parametros:
         nombre_base: nombre de la base de datos dentro de mongoDB
         nombre_colección: colección de la cual se quieren obtener datos
+        estimado: si es True, usa los metadatos de la colección (tiempo constante)
+            en lugar de recorrerla completa.
     """
     db = client[nombre_base]
     coleccion = db[nombre_coleccion]
@@ -177,12 +555,112 @@ def contar_documentos(nombre_base, nombre_coleccion):
     if not coleccion_existe(db, nombre_coleccion):
         raise KeyError(
             f"La colección '{nombre_coleccion}' no existe en la base '{nombre_base}'.")
-    
+
+    if estimado:
+        return coleccion.estimated_document_count()
     return coleccion.count_documents({})
 
+#-----------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+#                                                             CONTEOS MATERIALIZADOS
+#-----------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+def operaciones_resumen(nombre_coleccion, documentos, quitados=()):
+    """
+    Arma los UpdateOne que suman a los conteos materializados de una colección los documentos dados
+    y restan los quitados. Cada conteo es un documento {_id: {campo, valor}, cantidad} en
+    'resumen_<coleccion>'; el total de la colección se guarda con campo None y un campo ausente
+    cuenta como valor None.
+
+    Retorna:
+        lista de operaciones (vacía si la colección no tiene resumen o nada cambia)
+    """
+    campos = RESUMENES_COLECCIONES.get(nombre_coleccion)
+    if not campos:
+        return []
+
+    conteos = Counter({(None, None): len(documentos) - len(quitados)})
+    for campo in campos:
+        conteos.update((campo, doc.get(campo)) for doc in documentos)
+        conteos.subtract((campo, doc.get(campo)) for doc in quitados)
+
+    return [
+        UpdateOne({"_id": {"campo": campo, "valor": valor}}, {"$inc": {"cantidad": cantidad}}, upsert=True)
+        for (campo, valor), cantidad in conteos.items() if cantidad
+    ]
+
+def actualizar_resumen(nombre_base, nombre_coleccion, documentos, quitados=()):
+    """
+    Suma a los conteos materializados de una colección los documentos recién insertados
+    y resta los reemplazados o borrados (ver operaciones_resumen). Si la colección todavía no
+    tiene resumen (ej. datos cargados antes de que existiera), una diferencia dejaría conteos
+    parciales: se materializa completo, lo que ya incluye los cambios.
+
+    Parametros:
+        nombre_base: nombre de la base de datos dentro de mongoDB
+        nombre_coleccion: colección a la que se insertaron los documentos
+        documentos: lista de diccionarios insertados
+        quitados (opcional): versión previa de los documentos reemplazados o borrados
+    """
+    if nombre_coleccion not in RESUMENES_COLECCIONES:
+        return None
+    resumen = client[nombre_base][f"resumen_{nombre_coleccion}"]
+    if not coleccion_existe(client[nombre_base], resumen.name):
+        return materializar_resumen(nombre_base, nombre_coleccion)
+
+    operaciones = operaciones_resumen(nombre_coleccion, documentos, quitados)
+    if not operaciones:
+        return None
+    return resumen.bulk_write(operaciones, ordered=False)
+
+@instrumentar("mongo")
+def materializar_resumen(nombre_base, nombre_coleccion):
+    """
+    Recalcula desde cero los conteos materializados de una colección con $group y $merge
+    (por ejemplo, para datos cargados antes de que existiera el resumen).
+
+    Parametros:
+        nombre_base: nombre de la base de datos dentro de mongoDB
+        nombre_coleccion: colección a resumir
+    """
+    campos = RESUMENES_COLECCIONES.get(nombre_coleccion, [])
+    db = client[nombre_base]
+    nombre_resumen = f"resumen_{nombre_coleccion}"
+    db.drop_collection(nombre_resumen)
+    _quitar_del_catalogo(nombre_base, nombre_resumen)
+
+    merge = {"$merge": {"into": nombre_resumen, "whenMatched": "replace", "whenNotMatched": "insert"}}
+    for campo in [None] + campos:
+        db[nombre_coleccion].aggregate([
+            {"$group": {
+                # Sin $ifNull, los documentos sin el campo quedarían sin 'valor' en el _id
+                "_id": {"campo": campo, "valor": {"$ifNull": [f"${campo}", None]} if campo else None},
+                "cantidad": {"$sum": 1}
+            }},
+            merge
+        ])
+
+    print(f"✅ Resumen de '{nombre_coleccion}' materializado en '{nombre_resumen}'.")
+
+def _contador_resumen(db, coleccion, agrupacion, campo_calculo):
+    """
+    Lee un conteo agrupado desde el resumen materializado, con el mismo formato que contador().
+    Devuelve None si la colección no tiene resumen.
+    """
+    if agrupacion not in RESUMENES_COLECCIONES.get(coleccion, []) and agrupacion is not None:
+        return None
+    if not coleccion_existe(db, f"resumen_{coleccion}"):
+        return None
+
+    # Los conteos que llegaron a cero por cambios incrementales quedan en el resumen
+    documentos = db[f"resumen_{coleccion}"].find({"_id.campo": agrupacion, "cantidad": {"$gt": 0}})
+    return [{"_id": doc["_id"].get("valor"), campo_calculo: doc["cantidad"]} for doc in documentos]
+
+@instrumentar("mongo", contar_resultado=True)
 def contador(nombre_base, coleccion, agrupacion=None, campo_calculo="cantidad", filtrar=None):
     """
     Realiza un conteo (u operación genérica) de documentos en MongoDB con opción de agrupar y filtrar.
+    Si no hay filtro y la agrupación tiene un conteo materializado (RESUMENES_COLECCIONES),
+    el resultado se lee del resumen sin recorrer la colección.
 
     Parámetros:
         nombre_base: str, nombre de la base de datos
@@ -198,6 +676,11 @@ def contador(nombre_base, coleccion, agrupacion=None, campo_calculo="cantidad",
     db = client[nombre_base]
     coll = db[coleccion]
 
+    if not filtrar and coleccion in RESUMENES_COLECCIONES:
+        resultado = _contador_resumen(db, coleccion, agrupacion, campo_calculo)
+        if resultado is not None:
+            return resultado
+
     pipeline = []
 
     # Si hay filtro, agregamos $match
@@ -224,3 +707,39 @@ def contador(nombre_base, coleccion, agrupacion=None, campo_calculo="cantidad",
     resultado = list(coll.aggregate(pipeline))
     return resultado
 
+def _etapas_plan(plan):
+    """
+    Recorre un plan de ejecución de MongoDB y devuelve los nombres de todas sus etapas.
+    """
+    etapas = [plan.get("stage")]
+    for clave in ("inputStage", "queryPlan"):
+        if clave in plan:
+            etapas += _etapas_plan(plan[clave])
+    for subplan in plan.get("inputStages", []):
+        etapas += _etapas_plan(subplan)
+    return etapas
+
+def verificar_planes(nombre_base, consultas=None):
+    """
+    Ejecuta explain() sobre las consultas indicadas y marca las que recorren
+    la colección completa (COLLSCAN) en lugar de usar un índice.
+
+    Parametros:
+        nombre_base: nombre de la base de datos dentro de mongoDB
+        consultas (opcional): lista de tuplas (coleccion, filtro). Por defecto CONSULTAS_ESTANDAR
+    Retorna:
+        lista de tuplas (coleccion, filtro) que hacen COLLSCAN
+    """
+    db = client[nombre_base]
+    sin_indice = []
+
+    for nombre_coleccion, filtro in consultas or CONSULTAS_ESTANDAR:
+        plan = db[nombre_coleccion].find(filtro).explain()
+        etapas = _etapas_plan(plan["queryPlanner"]["winningPlan"])
+        if "COLLSCAN" in etapas:
+            sin_indice.append((nombre_coleccion, filtro))
+            print(f"❌ COLLSCAN en '{nombre_coleccion}' con filtro {filtro}")
+        else:
+            print(f"✅ '{nombre_coleccion}' con filtro {filtro} usa índice ({' <- '.join(e for e in etapas if e)})")
+
+    return sin_indice
@@ -1,15 +1,63 @@
 import pandas as pd
-from pathlib import Path
+import time
+from neo4j.graph import Node, Relationship
 from db_connections import db_neo4j
-from src import utils,neo4j
+from src import utils,neo4j,recomendaciones
+from src.metricas import instrumentar, registrar_lote
+
+# Restricciones e índices del grafo. Todas usan IF NOT EXISTS, por lo que se pueden ejecutar varias veces.
+ESQUEMA_NEO4J = [
+    # Unicidad de las claves usadas por MERGE/MATCH (crea también el índice de búsqueda)
+    "CREATE CONSTRAINT usuario_id_unico IF NOT EXISTS FOR (u:Usuario) REQUIRE u.usuario_id IS UNIQUE",
+    "CREATE CONSTRAINT destino_id_unico IF NOT EXISTS FOR (d:Destino) REQUIRE d.destino_id IS UNIQUE",
+    # Propiedades filtradas en las consultas
+    "CREATE INDEX destino_ciudad IF NOT EXISTS FOR (d:Destino) ON (d.ciudad)",
+    "CREATE INDEX destino_provincia IF NOT EXISTS FOR (d:Destino) ON (d.provincia)",
+    # Búsqueda por nombre: nombre en minúsculas con índice de texto (CONTAINS) y full-text
+    "CREATE TEXT INDEX usuario_nombre_normalizado IF NOT EXISTS FOR (u:Usuario) ON (u.nombre_normalizado)",
+    "CREATE FULLTEXT INDEX usuario_nombre_completo IF NOT EXISTS FOR (u:Usuario) ON EACH [u.nombre, u.apellido]",
+]
+
+#--------------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+#                                               Esquema
+#--------------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+@instrumentar("neo4j")
+def crear_esquema_neo4j(driver=None):
+    """
+    Crea las restricciones de unicidad y los índices definidos en ESQUEMA_NEO4J y espera
+    a que estén disponibles. Debe ejecutarse antes de las cargas masivas para que los
+    MERGE y MATCH por clave no recorran todos los nodos de la etiqueta.
+
+    Args:
+        driver: Instancia del driver de Neo4j. Por defecto db_neo4j.
+    """
+    driver = driver or db_neo4j
+    with driver.session() as session:
+        for sentencia in ESQUEMA_NEO4J:
+            session.run(sentencia).consume()
+        session.run("CALL db.awaitIndexes()").consume()
+
+    print("✅ Restricciones e índices de Neo4j creados.")
 
 #--------------------------------------------------------------------------------------------------------------------------------------------------------------------------------
 #                                               Creacicion de Nodos
 #--------------------------------------------------------------------------------------------------------------------------------------------------------------------------------
 
+# Catálogo local de etiquetas que ya tienen nodos. Se completa al crear nodos con este módulo.
+_etiquetas_con_nodos = set()
+
+def invalidar_catalogo_neo4j():
+    """
+    Descarta el catálogo local de etiquetas (por ejemplo, después de borrar nodos).
+    """
+    _etiquetas_con_nodos.clear()
+
 def nodo_existe(label, driver):
     """
     Verifica si existen nodos de un tipo específico en Neo4j.
+    Si la etiqueta ya figura en el catálogo local no consulta la base; si no, busca
+    un único nodo (LIMIT 1) en lugar de contarlos todos.
 
     Args:
         label (str): La etiqueta del nodo a verificar (ej. 'Usuario', 'Destino').
@@ -18,10 +66,15 @@ def nodo_existe(label, driver):
     Returns:
         bool: True si existen nodos de ese tipo, False si no existen.
     """
-    query = f"MATCH (n:{label}) RETURN count(n) > 0 AS existe"
+    if label in _etiquetas_con_nodos:
+        return True
+
+    query = f"MATCH (n:{label}) RETURN n LIMIT 1"
     with driver.session() as session:
-        resultado = session.run(query)
-        return resultado.single()["existe"]
+        existe = session.run(query).peek() is not None
+    if existe:
+        _etiquetas_con_nodos.add(label)
+    return existe
 
 def crear_nodo(tx, nombre_nodo, clave_id, datos):
     """
@@ -47,20 +100,88 @@ def crear_nodo(tx, nombre_nodo, clave_id, datos):
     return result.single()
 
 
-def crear_nodos_neo4j(nombre_coleccion, df):
+def query_nodos_lote(nombre_nodo, clave_id, actualizar=False):
+    """
+    Arma la query UNWIND que crea un lote de nodos (usada por crear_nodos_lote y su versión async).
+    Si actualizar es True, también pisa las propiedades de los nodos que ya existían.
+    """
+    asignacion = "SET" if actualizar else "ON CREATE SET"
+    return f"""
+    UNWIND $filas AS fila
+    MERGE (n:{nombre_nodo} {{{clave_id}: fila.{clave_id}}})
+    {asignacion}
+        n += fila
+    RETURN count(n) AS cantidad
+    """
+
+def crear_nodos_lote(tx, nombre_nodo, clave_id, filas, actualizar=False):
+    """
+    Crea en una sola transacción un lote de nodos usando UNWIND.
+    Equivale a invocar crear_nodo para cada fila, pero con una única query.
+
+    Parámetros:
+    - tx: transacción Neo4j
+    - nombre_nodo: etiqueta del nodo (string)
+    - clave_id: nombre del campo único (string)
+    - filas: lista de diccionarios con las propiedades de cada nodo
+    - actualizar: si es True, actualiza las propiedades de los nodos existentes
+
+    Retorna:
+    - cantidad de filas procesadas por la query
+    """
+    result = tx.run(query_nodos_lote(nombre_nodo, clave_id, actualizar), filas=filas)
+    return result.single()["cantidad"]
+
+@instrumentar("neo4j")
+def crear_nodos_masivo(nombre_nodo, clave_id, filas, tamano_lote=1000, actualizar=False):
+    """
+    Crea nodos en Neo4j enviando las filas en lotes, una transacción por lote.
+
+    Parámetros:
+        nombre_nodo: etiqueta del nodo (ej. 'Usuario', 'Destino')
+        clave_id: nombre del campo único del nodo (ej. 'usuario_id')
+        filas: iterable de diccionarios con las propiedades de cada nodo
+        tamano_lote: cantidad de nodos enviados por transacción. Por defecto 1000
+        actualizar: si es True, actualiza las propiedades de los nodos existentes
+
+    Retorna:
+        cantidad total de nodos procesados
+    """
+    total = 0
+    inicio = time.perf_counter()
+
+    with db_neo4j.session() as session:
+        for lote in utils.dividir_en_lotes(filas, tamano_lote):
+            total += session.execute_write(neo4j.crear_nodos_lote, nombre_nodo, clave_id, lote, actualizar)
+            registrar_lote("neo4j", filas=len(lote))
+
+    if total:
+        _etiquetas_con_nodos.add(nombre_nodo)
+
+    duracion = time.perf_counter() - inicio
+    velocidad = total / duracion if duracion > 0 else float(total)
+    print(f"⏱️ {total} nodos '{nombre_nodo}' escritos en {duracion:.2f}s ({velocidad:.0f} nodos/s).")
+    return total
+
+@instrumentar("neo4j")
+def crear_nodos_neo4j(nombre_coleccion, df, tamano_lote=1000, actualizar=False):
     """
     Crea nodos en Neo4j a partir de los datos de una colección específica (usuarios o destinos).
 
     Esta función toma un DataFrame de pandas y genera nodos en una base de datos Neo4j,
     diferenciando entre las colecciones de "usuarios" y "destinos". Cada fila del DataFrame
-    se convierte en un nodo con sus propiedades correspondientes.
+    se convierte en un nodo con sus propiedades correspondientes. Los nodos se envían
+    en lotes de `tamano_lote` filas por transacción.
 
     Args:
         nombre_coleccion (str): Nombre de la colección que se desea procesar.
             Debe ser "usuarios" o "destinos".
         df (pandas.DataFrame): DataFrame que contiene los datos a insertar.
             - Para "usuarios", se esperan las columnas: ["usuario_id", "nombre", "apellido"].
+              Además se guarda "nombre_normalizado" (nombre en minúsculas) para las búsquedas.
             - Para "destinos", se esperan las columnas: ["destino_id", "provincia", "ciudad"].
+        tamano_lote (int): cantidad de nodos por transacción. Por defecto 1000.
+        actualizar (bool): si es True, actualiza las propiedades de los nodos existentes.
 
     Returns: none
     """
@@ -73,17 +194,83 @@ def crear_nodos_neo4j(nombre_coleccion, df):
 
     #Filtro los dato que realmente me quiero guardar en Neo4J y lo transformo en un diccionario de listas
     if nombre_nodo == "Usuario":
-        filas = df[["usuario_id", "nombre", "apellido"]].to_dict("records")
+        df_usuarios = df[["usuario_id", "nombre", "apellido"]].copy()
+        # Nombre en minúsculas para las búsquedas por nombre con el índice de texto
+        df_usuarios["nombre_normalizado"] = df_usuarios["nombre"].str.lower()
+        filas = df_usuarios.to_dict("records")
     else:
         filas = df[["destino_id", "provincia", "ciudad"]].to_dict("records")
 
-    #Conecto con Neo4j 
-    with db_neo4j.session() as session: 
-        for fila in filas:
-            session.execute_write(neo4j.crear_nodo, nombre_nodo, campo_clave, fila) # Recorro filas y creo nodo invocando a la funcion creo nodo para cada usuarios/destino
+    #Envio los nodos en lotes con UNWIND en lugar de una transaccion por fila
+    crear_nodos_masivo(nombre_nodo, campo_clave, filas, tamano_lote, actualizar)
 
     print(f"✅ Nodos de tipo '{nombre_nodo}' creados exitosamente en Neo4j.")
 
+@instrumentar("neo4j")
+def eliminar_nodos(nombre_nodo, clave_id, valores, tamano_lote=1000):
+    """
+    Elimina (con sus relaciones) los nodos cuyas claves se indican, en lotes con UNWIND.
+    Si las recomendaciones están precalculadas, en la misma transacción se obtienen los usuarios
+    afectados por las relaciones que se quitan y al final se recalculan sus recomendaciones.
+
+    Parámetros:
+        nombre_nodo: etiqueta del nodo (ej. 'Usuario', 'Destino')
+        clave_id: nombre del campo único del nodo
+        valores: lista de claves a eliminar
+        tamano_lote: cantidad de nodos por transacción
+
+    Retorna:
+        cantidad de claves procesadas
+    """
+    patron = None
+    if recomendaciones.recomendaciones_precalculadas():
+        patron = recomendaciones.PATRONES_AFECTADOS_AL_ELIMINAR.get(nombre_nodo)
+    afectados_cypher = (f"OPTIONAL MATCH {patron}\n    WITH n, collect(DISTINCT afectado.usuario_id) AS afectados"
+                        if patron else "WITH n, [] AS afectados")
+    query = f"""
+    UNWIND $valores AS valor
+    MATCH (n:{nombre_nodo} {{{clave_id}: valor}})
+    {afectados_cypher}
+    DETACH DELETE n
+    RETURN afectados
+    """
+    total = 0
+    afectados = set()
+    with db_neo4j.session() as session:
+        for lote in utils.dividir_en_lotes(valores, tamano_lote):
+            filas = session.execute_write(lambda tx: [record["afectados"] for record in tx.run(query, valores=lote)])
+            afectados.update(usuario_id for fila in filas for usuario_id in fila)
+            registrar_lote("neo4j", filas=len(lote))
+            total += len(lote)
+
+    # Puede que la etiqueta se haya quedado sin nodos: se vuelve a verificar al usarla
+    _etiquetas_con_nodos.discard(nombre_nodo)
+    if patron:
+        if nombre_nodo == "Usuario":
+            # Las recomendaciones de los usuarios borrados se eliminan al recalcularlas
+            afectados.update(valores)
+        recomendaciones.actualizar_recomendaciones(afectados)
+    return total
+
+@instrumentar("neo4j")
+def aplicar_cambios_neo4j(nombre_coleccion, cambios, tamano_lote=1000):
+    """
+    Aplica en Neo4j los cambios de una carga incremental (ver mongo.calcular_cambios):
+    actualiza o crea los nodos modificados, elimina los que ya no están en la fuente y
+    agrega las relaciones VISITO de las reservas nuevas o modificadas.
+    Las relaciones VISITO existentes no se quitan, ya que pueden provenir de otras reservas.
+    """
+    df_cambios = cambios["cambios"]
+    if nombre_coleccion in ["usuarios", "destinos"]:
+        if not df_cambios.empty:
+            crear_nodos_neo4j(nombre_coleccion, df_cambios, tamano_lote, actualizar=True)
+        if cambios["eliminados"]:
+            nombre_nodo = "Usuario" if nombre_coleccion == "usuarios" else "Destino"
+            campo_clave = "usuario_id" if nombre_nodo == "Usuario" else "destino_id"
+            eliminar_nodos(nombre_nodo, campo_clave, cambios["eliminados"], tamano_lote)
+    elif nombre_coleccion == "reservas" and not df_cambios.empty:
+        crear_relaciones_visito(df_cambios.copy())
+
 #--------------------------------------------------------------------------------------------------------------------------------------------------------------------------------
 #                                               Creación de Relaciones
 #--------------------------------------------------------------------------------------------------------------------------------------------------------------------------------
@@ -115,7 +302,106 @@ def crear_relacion_bidireccional(tx, nodo_origen, campo_origen, valor_origen,
         valor_destino=valor_destino
     ).single()
 
-def crear_relaciones_visito(df):
+def query_relaciones_lote(nodo_origen, campo_origen, nodo_destino, campo_destino,
+                          tipo_relacion, bidireccional=False):
+    """
+    Arma la query UNWIND que crea un lote de relaciones (usada por crear_relaciones_lote y su versión async).
+    """
+    inversa = f"MERGE (b)-[:{tipo_relacion}]->(a)" if bidireccional else ""
+    return f"""
+    UNWIND $filas AS fila
+    MATCH (a:{nodo_origen} {{{campo_origen}: fila.origen}})
+    MATCH (b:{nodo_destino} {{{campo_destino}: fila.destino}})
+    MERGE (a)-[:{tipo_relacion}]->(b)
+    {inversa}
+    RETURN count(*) AS cantidad
+    """
+
+def crear_relaciones_lote(tx, nodo_origen, campo_origen, nodo_destino, campo_destino,
+                          tipo_relacion, filas, bidireccional=False):
+    """
+    Crea en una sola transacción un lote de relaciones del mismo tipo usando UNWIND.
+
+    Parámetros:
+    - tx: transacción Neo4j
+    - nodo_origen / nodo_destino: etiquetas de los nodos a relacionar
+    - campo_origen / campo_destino: campos únicos con los que se buscan los nodos
+    - tipo_relacion: tipo de la relación a crear
+    - filas: lista de diccionarios con las claves 'origen' y 'destino'
+    - bidireccional: si es True, crea también la relación inversa en la misma pasada
+
+    Retorna:
+    - cantidad de filas cuyos nodos existían y fueron relacionados
+    """
+    query = query_relaciones_lote(nodo_origen, campo_origen, nodo_destino, campo_destino,
+                                  tipo_relacion, bidireccional)
+    result = tx.run(query, filas=filas)
+    return result.single()["cantidad"]
+
+@instrumentar("neo4j")
+def crear_relaciones_masivo(df, nodo_origen, campo_origen, columna_origen,
+                            nodo_destino, campo_destino, columna_destino,
+                            columna_tipo=None, tipo_relacion=None,
+                            bidireccional=False, tamano_lote=5000):
+    """
+    Crea relaciones en Neo4j a partir de un DataFrame completo, agrupando las filas
+    por tipo de relación y enviándolas en lotes con UNWIND.
+
+    Parámetros:
+        df: DataFrame con una fila por relación
+        nodo_origen / nodo_destino: etiquetas de los nodos (ej. 'Usuario', 'Destino')
+        campo_origen / campo_destino: campos únicos de los nodos (ej. 'usuario_id')
+        columna_origen / columna_destino: columnas del DataFrame con los ids
+        columna_tipo (opcional): columna con el tipo de relación de cada fila
+        tipo_relacion (opcional): tipo fijo para todas las filas si no hay columna_tipo
+        bidireccional: si es True, crea ambas direcciones en la misma transacción
+        tamano_lote: cantidad de relaciones por transacción. Por defecto 5000
+
+    Retorna:
+        cantidad total de relaciones procesadas
+    """
+    if columna_tipo is None and tipo_relacion is None:
+        raise ValueError("Se debe indicar 'columna_tipo' o 'tipo_relacion'.")
+
+    if df is None or df.empty:
+        return 0
+
+    df_rel = df[[columna_origen, columna_destino]].rename(
+        columns={columna_origen: "origen", columna_destino: "destino"})
+    if columna_tipo is not None:
+        grupos = df_rel.groupby(df[columna_tipo], sort=False, observed=True)
+    else:
+        grupos = [(tipo_relacion, df_rel)]
+
+    total = 0
+    inicio = time.perf_counter()
+
+    escritas = []
+    with db_neo4j.session() as session:
+        for tipo, df_tipo in grupos:
+            filas = df_tipo.to_dict("records")
+            for lote in utils.dividir_en_lotes(filas, tamano_lote):
+                total += session.execute_write(
+                    neo4j.crear_relaciones_lote,
+                    nodo_origen, campo_origen, nodo_destino, campo_destino,
+                    tipo, lote, bidireccional
+                )
+                registrar_lote("neo4j", filas=len(lote))
+            escritas.append((tipo, df_tipo))
+
+    # Las recomendaciones precalculadas se actualizan solo para los usuarios afectados
+    if nodo_origen == "Usuario":
+        for tipo, df_tipo in escritas:
+            destinos = df_tipo["destino"].tolist() if nodo_destino == "Usuario" else ()
+            recomendaciones.mantener_recomendaciones(tipo, df_tipo["origen"].tolist(), destinos)
+
+    duracion = time.perf_counter() - inicio
+    velocidad = total / duracion if duracion > 0 else float(total)
+    print(f"⏱️ {total} relaciones escritas en {duracion:.2f}s ({velocidad:.0f} relaciones/s).")
+    return total
+
+@instrumentar("neo4j")
+def crear_relaciones_visito(df, tamano_lote=5000):
     """
     Crea relaciones VISITO entre Usuario y Destino en Neo4j 
     para reservas Confirmadas o Pagadas hasta la fecha actual.
@@ -123,7 +409,9 @@ def crear_relaciones_visito(df):
     if df.empty:
         return
 
-    df["fecha_reserva"] = pd.to_datetime(df["fecha_reserva"], errors="coerce")
+    # Las fuentes leídas con utils.leer_fuente ya traen la fecha como datetime
+    if not pd.api.types.is_datetime64_any_dtype(df["fecha_reserva"]):
+        df["fecha_reserva"] = pd.to_datetime(df["fecha_reserva"], errors="coerce")
     hoy = pd.Timestamp.today().normalize()
 
     df_validas = df[df["estado"].isin(["Confirmada", "Pagada"]) & (df["fecha_reserva"] <= hoy)]
@@ -132,36 +420,35 @@ def crear_relaciones_visito(df):
         print("⚠️ No hay reservas confirmadas/pagadas para crear relaciones VISITO.")
         return
 
-    with db_neo4j.session() as session:
-        for _, fila in df_validas.iterrows():
-            session.execute_write(
-                neo4j.crear_relacion_unidireccional,
-                "Usuario", "usuario_id", fila["usuario_id"],
-                "Destino", "destino_id", fila["destino_id"],
-                "VISITO"
-            )
+    crear_relaciones_masivo(
+        df_validas,
+        "Usuario", "usuario_id", "usuario_id",
+        "Destino", "destino_id", "destino_id",
+        tipo_relacion="VISITO",
+        tamano_lote=tamano_lote
+    )
 
     print("✅ Relaciones VISITO creadas exitosamente en Neo4j.")
 
-def crear_relaciones_usuarios():
+@instrumentar("neo4j")
+def crear_relaciones_usuarios(tamano_lote=5000):
     """
     Crea relaciones bidireccionales entre usuarios (usuarios_relaciones.csv).
     """
-    ruta_relaciones = Path("fuentes") / "usuarios_relaciones.csv"
-    df_rel = utils.lectura_csv(ruta_relaciones)
+    df_rel = utils.leer_fuente("usuarios_relaciones.csv")
 
     if df_rel is None or df_rel.empty:
         print("⚠️ No se encontraron relaciones entre usuarios.")
         return
 
-    with db_neo4j.session() as session:
-        for _, fila in df_rel.iterrows():
-            session.execute_write(
-                neo4j.crear_relacion_bidireccional,
-                "Usuario", "usuario_id", fila["usuario1"],
-                "Usuario", "usuario_id", fila["usuario2"],
-                fila["tipo"]
-            )
+    crear_relaciones_masivo(
+        df_rel,
+        "Usuario", "usuario_id", "usuario1",
+        "Usuario", "usuario_id", "usuario2",
+        columna_tipo="tipo",
+        bidireccional=True,
+        tamano_lote=tamano_lote
+    )
 
     print("✅ Relaciones entre usuarios creadas exitosamente en Neo4j.")
 
@@ -170,37 +457,118 @@ def crear_relaciones_usuarios():
 #                                               Consultas
 #--------------------------------------------------------------------------------------------------------------------------------------------------------------------------------
 
-def consulta(db, query, parametros=None):
+def _valor_plano(valor):
+    """
+    Convierte nodos y relaciones (también dentro de listas) en diccionarios, como hace record.data().
+    """
+    if isinstance(valor, (Node, Relationship)):
+        return dict(valor)
+    if isinstance(valor, list):
+        return [_valor_plano(v) for v in valor]
+    return valor
+
+def consulta_por_bloques(db, query, parametros=None, tamano_bloque=10000, fetch_size=None):
+    """
+    Ejecuta una query en Neo4j y devuelve los resultados de a bloques, cada uno como DataFrame.
+    Los registros se van leyendo del servidor a medida que se consumen, por lo que la memoria
+    usada depende del tamaño del bloque y no del total del resultado.
+
+    Parámetros:
+        db: objeto de conexión a Neo4j (db_neo4j)
+        query: string con la consulta Cypher
+        parametros: diccionario con parámetros de la query (opcional)
+        tamano_bloque: cantidad de filas de cada DataFrame devuelto
+        fetch_size: registros pedidos al servidor por viaje (opcional, por defecto el del driver)
+
+    Retorna:
+        generador de pd.DataFrame
+    """
+    config = {"fetch_size": fetch_size} if fetch_size else {}
+    with db.session(**config) as session:
+        resultados = session.run(query, parametros)
+        claves = resultados.keys()
+        columnas = [[] for _ in claves]
+        filas = 0
+
+        for record in resultados:
+            for columna, valor in zip(columnas, record.values()):
+                columna.append(_valor_plano(valor))
+            filas += 1
+            if filas == tamano_bloque:
+                yield pd.DataFrame(dict(zip(claves, columnas)))
+                columnas = [[] for _ in claves]
+                filas = 0
+
+        if filas or not claves:
+            yield pd.DataFrame(dict(zip(claves, columnas)))
+
+@instrumentar("neo4j", contar_resultado=True)
+def consulta(db, query, parametros=None, fetch_size=None):
     """
     Ejecuta una query en Neo4j y devuelve los resultados como un DataFrame.
+    El DataFrame se arma columna por columna, sin crear un diccionario por fila.
 
     Parámetros:
         db: objeto de conexión a Neo4j (db_neo4j)
         query: string con la consulta Cypher
         parametros: diccionario con parámetros de la query (opcional)
+        fetch_size: registros pedidos al servidor por viaje (opcional)
 
     Retorna:
         pd.DataFrame con los resultados
     """
-    with db.session() as session:
+    config = {"fetch_size": fetch_size} if fetch_size else {}
+    with db.session(**config) as session:
         resultados = session.run(query, parametros)
-        data = [record.data() for record in resultados]
-    return pd.DataFrame(data)
+        claves = resultados.keys()
+        columnas = [[] for _ in claves]
+        for record in resultados:
+            for columna, valor in zip(columnas, record.values()):
+                columna.append(_valor_plano(valor))
+    if not columnas or not columnas[0]:
+        return pd.DataFrame()
+    return pd.DataFrame(dict(zip(claves, columnas)))
+
+def exportar_consulta_csv(db, query, ruta, parametros=None, tamano_bloque=100000, fetch_size=None):
+    """
+    Exporta el resultado de una query a un CSV de a bloques, con memoria acotada.
+
+    Parámetros:
+        db: objeto de conexión a Neo4j (db_neo4j)
+        query: string con la consulta Cypher
+        ruta: ruta del CSV a generar
+        parametros: diccionario con parámetros de la query (opcional)
+        tamano_bloque: filas escritas por bloque
+        fetch_size: registros pedidos al servidor por viaje (opcional)
 
+    Retorna:
+        cantidad de filas exportadas
+    """
+    total = 0
+    for numero, bloque in enumerate(consulta_por_bloques(db, query, parametros, tamano_bloque, fetch_size)):
+        bloque.to_csv(ruta, mode="w" if numero == 0 else "a", header=numero == 0,
+                      index=False, encoding="utf-8")
+        total += len(bloque)
+    return total
+
+@instrumentar("neo4j")
 def eliminar_amigos(usuario_id):
     """
     Elimina las relaciones AMIGO_DE de un usuario id que se pasa como parametro
     """
     
     query = """
-    MATCH (u:Usuario {usuario_id: $id})-[r:AMIGO_DE]-()
-    WITH count(r) as cantidad, collect(r) as relaciones
+    MATCH (u:Usuario {usuario_id: $id})-[r:AMIGO_DE]-(amigo)
+    WITH count(r) as cantidad, collect(r) as relaciones, collect(DISTINCT amigo.usuario_id) as amigos
     FOREACH (rel IN relaciones | DELETE rel)
-    RETURN cantidad
+    RETURN cantidad, amigos
     """
     
     with db_neo4j.session() as session:
-        resultado = session.run(query,id=usuario_id)
-        cantidad = resultado.single()["cantidad"]
-        return cantidad
+        resultado = session.run(query,id=usuario_id).single()
+        cantidad = resultado["cantidad"]
+
+    # El usuario y sus ex amigos dejan de recomendarse destinos entre sí
+    recomendaciones.mantener_recomendaciones("AMIGO_DE", [usuario_id], resultado["amigos"])
+    return cantidad
       
\ No newline at end of file
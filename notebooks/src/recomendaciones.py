@@ -0,0 +1,131 @@
+from db_connections import db_neo4j, db_redis as r
+from src.utils import dividir_en_lotes
+from src.metricas import instrumentar, registrar_lote
+
+# Destinos que visitaron los amigos de cada usuario y que él todavía no visitó,
+# con la cantidad de amigos distintos que los visitaron como puntaje
+QUERY_RECOMENDACIONES = """
+UNWIND $ids AS id
+MATCH (u:Usuario {usuario_id: id})
+OPTIONAL MATCH (u)-[:AMIGO_DE]-(amigo:Usuario)-[:VISITO]->(d:Destino)
+WHERE NOT EXISTS { MATCH (u)-[:VISITO]->(d) }
+RETURN id AS usuario_id, d.destino_id AS destino_id, count(DISTINCT amigo) AS puntaje
+"""
+
+QUERY_AMIGOS = """
+UNWIND $ids AS id
+MATCH (:Usuario {usuario_id: id})-[:AMIGO_DE]-(amigo:Usuario)
+RETURN DISTINCT amigo.usuario_id AS usuario_id
+"""
+
+# Indica que las recomendaciones ya se calcularon y deben mantenerse al escribir relaciones
+CLAVE_PRECALCULADAS = "recomendaciones:precalculadas"
+
+# Usuarios cuyas recomendaciones cambian al borrar un nodo 'n' de cada etiqueta (ver neo4j.eliminar_nodos):
+# los amigos de un usuario borrado pierden sus visitas y quienes tenían amigos que visitaron
+# un destino borrado lo pierden como recomendado
+PATRONES_AFECTADOS_AL_ELIMINAR = {
+    "Usuario": "(n)-[:AMIGO_DE]-(afectado:Usuario)",
+    "Destino": "(n)<-[:VISITO]-(:Usuario)-[:AMIGO_DE]-(afectado:Usuario)",
+}
+
+def clave_recomendaciones(usuario_id):
+    """
+    Devuelve la clave del sorted set de recomendaciones de un usuario.
+    """
+    return f"recomendaciones:{usuario_id}"
+
+@instrumentar("redis")
+def actualizar_recomendaciones(usuario_ids, tamano_lote=1000):
+    """
+    Recalcula en Neo4j y reemplaza en Redis las recomendaciones de los usuarios indicados.
+    Cada usuario tiene un sorted set destino_id -> puntaje que se reemplaza en una transacción.
+
+    Parametros:
+        usuario_ids: iterable con los ids de usuario a recalcular
+        tamano_lote: usuarios calculados por query
+    Retorna:
+        cantidad de usuarios actualizados
+    """
+    total = 0
+    with db_neo4j.session() as session:
+        for lote in dividir_en_lotes(usuario_ids, tamano_lote):
+            puntajes = {usuario_id: {} for usuario_id in lote}
+            registrar_lote("neo4j", filas=len(lote))
+            for record in session.run(QUERY_RECOMENDACIONES, ids=lote):
+                if record["destino_id"] is not None:
+                    puntajes[record["usuario_id"]][record["destino_id"]] = record["puntaje"]
+
+            with r.pipeline(transaction=True) as pipe:
+                for usuario_id, destinos in puntajes.items():
+                    clave = clave_recomendaciones(usuario_id)
+                    pipe.delete(clave)
+                    if destinos:
+                        pipe.zadd(clave, destinos)
+                pipe.execute()
+            registrar_lote("redis", filas=len(lote))
+            total += len(lote)
+    return total
+
+def precalcular_recomendaciones(tamano_lote=1000):
+    """
+    Calcula las recomendaciones de todos los usuarios del grafo y marca que, a partir de
+    ahora, deben actualizarse cada vez que se escriben relaciones VISITO o AMIGO_DE.
+
+    Retorna:
+        cantidad de usuarios procesados
+    """
+    with db_neo4j.session() as session:
+        ids = [record["id"] for record in session.run("MATCH (u:Usuario) RETURN u.usuario_id AS id")]
+
+    total = actualizar_recomendaciones(ids, tamano_lote)
+    r.set(CLAVE_PRECALCULADAS, 1)
+    print(f"✅ Recomendaciones precalculadas para {total} usuarios.")
+    return total
+
+def usuarios_afectados(tipo_relacion, origenes, destinos=()):
+    """
+    Devuelve los usuarios cuyas recomendaciones cambian al escribir relaciones.
+
+    Parametros:
+        tipo_relacion: 'VISITO' o 'AMIGO_DE' (otros tipos no afectan las recomendaciones)
+        origenes: ids de usuario de origen de las relaciones
+        destinos: ids del otro extremo (usuarios, para AMIGO_DE)
+    """
+    if tipo_relacion == "AMIGO_DE":
+        return set(origenes) | set(destinos)
+    if tipo_relacion != "VISITO":
+        return set()
+
+    # Quien visita deja de tener ese destino como recomendado y sus amigos lo suman
+    origenes = list(set(origenes))
+    with db_neo4j.session() as session:
+        amigos = {record["usuario_id"] for record in session.run(QUERY_AMIGOS, ids=origenes)}
+    return set(origenes) | amigos
+
+def recomendaciones_precalculadas():
+    """Indica si las recomendaciones ya se precalcularon y hay que mantenerlas."""
+    return bool(r.exists(CLAVE_PRECALCULADAS))
+
+def mantener_recomendaciones(tipo_relacion, origenes, destinos=()):
+    """
+    Actualiza solo los usuarios afectados por nuevas relaciones, si las recomendaciones
+    ya fueron precalculadas (si no, no hace nada: se calculan al final de la carga).
+    """
+    if tipo_relacion not in ("VISITO", "AMIGO_DE") or not recomendaciones_precalculadas():
+        return 0
+    return actualizar_recomendaciones(usuarios_afectados(tipo_relacion, origenes, destinos))
+
+@instrumentar("redis", contar_resultado=True)
+def obtener_recomendaciones(usuario_id, cantidad=10):
+    """
+    Devuelve los destinos recomendados para un usuario, de mayor a menor puntaje.
+
+    Parametros:
+        usuario_id: id del usuario
+        cantidad: cantidad máxima de destinos a devolver
+    Retorna:
+        lista de tuplas (destino_id, puntaje)
+    """
+    recomendados = r.zrevrange(clave_recomendaciones(usuario_id), 0, cantidad - 1, withscores=True)
+    return [(int(destino_id), int(puntaje)) for destino_id, puntaje in recomendados]
@@ -1,46 +1,386 @@
-from db_connections import db_redis as r
-import random, json
+from db_connections import db_redis as r, db_redis_binario as rb
+from src.utils import dividir_en_lotes
+from src.metricas import instrumentar, registrar_cache, registrar_lote
+import random, json, time, zlib
+import pandas as pd
+
+CAMPOS_RESERVA_TEMPORAL = ["usuario_id", "destino_id", "fecha_reserva", "precio_total"]
+
+def filas_reservas_temporales(df):
+    """
+    Devuelve las reservas como lista de diccionarios listos para guardar en hashes de Redis
+    (la fecha, si viene como datetime de utils.leer_fuente, se pasa a texto).
+    """
+    if pd.api.types.is_datetime64_any_dtype(df["fecha_reserva"]):
+        df = df.assign(fecha_reserva=df["fecha_reserva"].dt.strftime("%Y-%m-%d"))
+    return df.to_dict(orient="records")
+
+def _version_reservas_temporales():
+    version = r.get("version_reserva_temp")
+    registrar_lote("redis")
+    return version
+
+def prefijo_reservas_temporales(version=None):
+    """
+    Devuelve el prefijo de las reservas temporales vigentes.
+    Las recargas escriben en 'reserva_temp:v<version>'; sin versión se usa el prefijo original.
+
+    Parametros:
+        version (opcional): versión a usar. Por defecto la vigente en Redis.
+    """
+    version = version if version is not None else _version_reservas_temporales()
+    return f"reserva_temp:v{version}" if version else "reserva_temp"
+
+def patron_reservas_temporales(version=None):
+    """
+    Devuelve el patrón SCAN de las reservas temporales de una versión (por defecto la vigente).
+    """
+    prefijo = prefijo_reservas_temporales(version)
+    # Las claves sin versión son 'reserva_temp:<id numérico>' y no deben incluir las versionadas
+    return "reserva_temp:[0-9]*" if prefijo == "reserva_temp" else f"{prefijo}:*"
+
+def indice_reservas_temporales(version=None):
+    """
+    Devuelve la clave del sorted set que indexa las reservas temporales de una versión (por defecto
+    la vigente): cada clave de reserva con su vencimiento como puntaje. Las reservas sin versión
+    no tienen índice (devuelve None).
+    """
+    version = version if version is not None else _version_reservas_temporales()
+    return f"indice_reserva_temp:v{version}" if version else None
+
+@instrumentar("redis")
+def borrar_claves_por_lotes(patron, tamano_lote=500):
+    """
+    Borra las claves que cumplen un patrón de a lotes chicos con UNLINK, que libera
+    la memoria en segundo plano sin bloquear al resto de los clientes.
+
+    Parametros:
+        patron: patrón de las claves a borrar
+        tamano_lote: cantidad de claves por UNLINK
+    Retorna:
+        cantidad de claves borradas
+    """
+    total = 0
+    for lote in dividir_en_lotes(r.scan_iter(match=patron, count=tamano_lote), tamano_lote):
+        r.unlink(*lote)
+        registrar_lote("redis", filas=len(lote))
+        total += len(lote)
+    return total
 
 def borrar_reservas_temporales():
     """
     Borra todas las reservas temporales y devuelve la cantidad de claves eliminadas.
     """
-    claves = list(r.scan_iter("reserva_temp:*"))
-    
-    if not claves:
+    version = _version_reservas_temporales()
+    cantidad = borrar_claves_por_lotes(patron_reservas_temporales(version))
+    if version:
+        r.unlink(indice_reservas_temporales(version))
+        registrar_lote("redis")
+
+    if not cantidad:
         return None
-    
-    r.delete(*claves)
-    
-    return len(claves)
 
-def carga_masiva_reservas_temporales(df, ttl=3600):
+    return cantidad
+
+def contar_reservas_temporales():
+    """
+    Devuelve la cantidad de reservas temporales vigentes: un ZCOUNT sobre el índice de la versión
+    vigente, sin recorrer el keyspace (solo las reservas sin versión se cuentan con SCAN).
+    """
+    indice = indice_reservas_temporales()
+    if indice is None:
+        return contar_claves(patron_reservas_temporales())
+    registrar_lote("redis")
+    return r.zcount(indice, f"({time.time()}", "+inf")
+
+def iniciar_recarga_reservas_temporales():
+    """
+    Reserva una versión nueva de las reservas temporales, todavía no vigente, para escribir una
+    recarga (también de a bloques) sin que los lectores la vean a medias.
+
+    Retorna:
+        número de la versión reservada
+    """
+    registrar_lote("redis")
+    return r.incr("secuencia_reserva_temp")
+
+def publicar_reservas_temporales(version):
+    """
+    Vuelve vigente una versión escrita con iniciar_recarga_reservas_temporales: cambia la versión
+    en una sola operación y recién después borra de a lotes las claves (y el índice) de la anterior.
+    """
+    anterior = r.set("version_reserva_temp", version, get=True)
+    registrar_lote("redis")
+    borrar_claves_por_lotes(patron_reservas_temporales(anterior) if anterior else "reserva_temp:[0-9]*")
+    if anterior:
+        r.unlink(indice_reservas_temporales(anterior))
+        registrar_lote("redis")
+
+def descartar_reservas_temporales(version):
+    """
+    Borra una versión reservada que no llegó a publicarse (por ejemplo, si la carga falló).
+    """
+    borrar_claves_por_lotes(patron_reservas_temporales(version))
+    r.unlink(indice_reservas_temporales(version))
+    registrar_lote("redis")
+
+@instrumentar("redis")
+def recargar_reservas_temporales(df, ttl=3600, tamano_lote=1000):
+    """
+    Recarga las reservas temporales sin dejar a los lectores sin datos: las nuevas se
+    escriben en un espacio de claves versionado, luego se cambia la versión vigente en
+    una sola operación y recién después se borran las claves viejas de a lotes.
+    Si no hay reservas, la versión vigente queda vacía.
+
+    Parametros:
+        df: DataFrame con los datos
+        ttl: tiempo de expiración de la clave.
+        tamano_lote: cantidad de reservas enviadas por pipeline.
+    Retorna:
+        cantidad de reservas cargadas
+    """
+    nueva = iniciar_recarga_reservas_temporales()
+    try:
+        total = carga_masiva_reservas_temporales(df, ttl, tamano_lote, version=nueva) or 0
+    except Exception:
+        descartar_reservas_temporales(nueva)
+        raise
+
+    # Cambio atómico de versión: desde aquí los lectores ven solo las reservas nuevas
+    publicar_reservas_temporales(nueva)
+    return total
+
+def generar_clave(prefijo, valor_id, sufijo=None):
+    """
+    Arma una clave de Redis con el formato <prefijo>:<id>[:<sufijo>].
+    """
+    clave = f"{prefijo}:{valor_id}"
+    return f"{clave}:{sufijo}" if sufijo else clave
+
+@instrumentar("redis")
+def carga_masiva_hashes(filas, prefijo, campo_id, campos=None, ttl=None,
+                        sufijo=None, tamano_lote=1000, transaccional=False, indice=None):
+    """
+    Carga masivamente hashes en Redis usando pipelines, enviando el HSET y su
+    EXPIRE en el mismo viaje al servidor.
+
+    Parametros:
+        filas: iterable de diccionarios con los datos
+        prefijo: prefijo de la clave (ej. 'reserva_temp')
+        campo_id: campo de la fila que identifica la clave
+        campos (opcional): campos a guardar en el hash. Si es None, se guardan todos menos campo_id
+        ttl (opcional): tiempo de expiración de cada clave en segundos
+        sufijo (opcional): sufijo de la clave (ej. 'sesion')
+        tamano_lote: cantidad de claves enviadas por pipeline. Por defecto 1000
+        transaccional: si es True, cada lote se ejecuta en un MULTI/EXEC
+        indice (opcional): sorted set donde se registra cada clave con su vencimiento como puntaje
+            (ver indice_reservas_temporales); en el mismo pipeline se quitan las ya vencidas
+    Retorna:
+        cantidad de claves escritas
+    """
+    total = 0
+    for lote in dividir_en_lotes(filas, tamano_lote):
+        with r.pipeline(transaction=transaccional) as pipe:
+            ahora = time.time()
+            for fila in lote:
+                clave = generar_clave(prefijo, fila[campo_id], sufijo)
+                nombres = campos or [c for c in fila if c != campo_id]
+                pipe.hset(clave, mapping={c: fila[c] for c in nombres})
+                if ttl:
+                    pipe.expire(clave, ttl)
+                if indice:
+                    pipe.zadd(indice, {clave: ahora + ttl if ttl else "+inf"})
+            if indice:
+                pipe.zremrangebyscore(indice, "-inf", ahora)
+                if ttl:
+                    # El índice vive lo mismo que su clave más duradera
+                    pipe.expire(indice, ttl, nx=True)
+                    pipe.expire(indice, ttl, gt=True)
+            pipe.execute()
+        registrar_lote("redis", filas=len(lote))
+        total += len(lote)
+    return total
+
+@instrumentar("redis")
+def carga_masiva_valores(filas, prefijo, campo_id, valor, ttl=None,
+                         sufijo=None, tamano_lote=1000, transaccional=False):
+    """
+    Carga masivamente claves simples (SET) en Redis usando pipelines.
+
+    Parametros:
+        filas: iterable de diccionarios con los datos
+        prefijo: prefijo de la clave (ej. 'usuario')
+        campo_id: campo de la fila que identifica la clave
+        valor: valor a guardar en cada clave
+        ttl (opcional): tiempo de expiración de cada clave en segundos
+        sufijo (opcional): sufijo de la clave (ej. 'sesion')
+        tamano_lote: cantidad de claves enviadas por pipeline. Por defecto 1000
+        transaccional: si es True, cada lote se ejecuta en un MULTI/EXEC
+    Retorna:
+        cantidad de claves escritas
+    """
+    total = 0
+    for lote in dividir_en_lotes(filas, tamano_lote):
+        with r.pipeline(transaction=transaccional) as pipe:
+            for fila in lote:
+                pipe.set(generar_clave(prefijo, fila[campo_id], sufijo), valor, ex=ttl)
+            pipe.execute()
+        registrar_lote("redis", filas=len(lote))
+        total += len(lote)
+    return total
+
+def carga_masiva_reservas_temporales(df, ttl=3600, tamano_lote=1000, limpiar=True, version=None):
     """
     Carga masivamente en Redis las reservas temporales
 
     Parametros:
         df: DataFrame con los datos
         ttl: tiempo de expiración de la clave.
+        tamano_lote: cantidad de reservas enviadas por pipeline.
+        limpiar: si es True, reemplaza las reservas existentes (ver recargar_reservas_temporales);
+            si es False, las agrega a la versión vigente.
+        version (opcional): versión reservada con iniciar_recarga_reservas_temporales en la que
+            se escriben las reservas, sin publicarla (carga por bloques). Ignora `limpiar`.
     """
+    if version is None and limpiar:
+        return recargar_reservas_temporales(df, ttl, tamano_lote)
+
     if df is None or df.empty:
         return None
 
-    borrar_reservas_temporales()    
-    filas = df.to_dict(orient="records")
-    
-    for fila in filas:
-        clave = f"reserva_temp:{fila['reserva_id']}"
-        r.hset(clave, mapping={
-                "usuario_id": fila["usuario_id"],
-                "destino_id": fila["destino_id"],
-                "fecha_reserva": fila["fecha_reserva"],
-                "precio_total": fila["precio_total"]
-        })
-        r.expire(clave, ttl)
+    return carga_masiva_hashes(
+        filas_reservas_temporales(df), prefijo_reservas_temporales(version), "reserva_id",
+        campos=CAMPOS_RESERVA_TEMPORAL, ttl=ttl, tamano_lote=tamano_lote,
+        indice=indice_reservas_temporales(version)
+    )
+
+@instrumentar("redis")
+def aplicar_cambios_redis(nombre_coleccion, cambios, ttl=3600, tamano_lote=1000):
+    """
+    Aplica en Redis los cambios de una carga incremental de reservas (ver mongo.calcular_cambios):
+    escribe las reservas temporales nuevas o modificadas en la versión vigente y borra las que
+    se eliminaron o dejaron de ser temporales (ya tienen estado).
+
+    Parametros:
+        nombre_coleccion: nombre de la colección (solo se procesa 'reservas')
+        cambios: diccionario devuelto por mongo.calcular_cambios
+        ttl: tiempo de expiración de las reservas temporales
+        tamano_lote: cantidad de claves por pipeline / UNLINK
+    Retorna:
+        cantidad de claves escritas o borradas
+    """
+    if nombre_coleccion != "reservas":
+        return 0
 
-    return len(filas)
+    df_cambios = cambios["cambios"]
+    version = _version_reservas_temporales()
+    prefijo = prefijo_reservas_temporales(version)
+    indice = indice_reservas_temporales(version)
+    temporales = df_cambios[df_cambios["estado"].isna()]
+    escritas = carga_masiva_hashes(
+        filas_reservas_temporales(temporales), prefijo, "reserva_id",
+        campos=CAMPOS_RESERVA_TEMPORAL, ttl=ttl, tamano_lote=tamano_lote, indice=indice
+    )
 
-def guardar_usuarios_conectados(df, cantidad=10):
+    quitar = df_cambios.loc[df_cambios["estado"].notna(), "reserva_id"].tolist() + list(cambios["eliminados"])
+    for lote in dividir_en_lotes(quitar, tamano_lote):
+        claves = [generar_clave(prefijo, reserva_id) for reserva_id in lote]
+        with r.pipeline(transaction=False) as pipe:
+            pipe.unlink(*claves)
+            if indice:
+                pipe.zrem(indice, *claves)
+            pipe.execute()
+
+    return escritas + len(quitar)
+
+# Presencia de usuarios: un sorted set con el usuario_id como miembro y el momento en que
+# vence su sesión (epoch en segundos) como puntaje. Registrar o renovar una sesión es un ZADD
+# y contar los conectados un ZCOUNT, ambos O(log n) sin recorrer el keyspace.
+CLAVE_CONECTADOS = "usuarios:conectados"
+TTL_SESION = 3600
+
+@instrumentar("redis")
+def registrar_sesiones(usuario_ids, ttl=TTL_SESION, tamano_lote=1000):
+    """
+    Registra (o renueva) la sesión de varios usuarios, con un ZADD por lote.
+
+    Parametros:
+        usuario_ids: iterable con los ids de usuario
+        ttl: segundos hasta que vence cada sesión
+        tamano_lote: cantidad de usuarios por ZADD
+    Retorna:
+        cantidad de sesiones registradas
+    """
+    total = 0
+    for lote in dividir_en_lotes(usuario_ids, tamano_lote):
+        vence = time.time() + ttl
+        r.zadd(CLAVE_CONECTADOS, {usuario_id: vence for usuario_id in lote})
+        registrar_lote("redis", filas=len(lote))
+        total += len(lote)
+    return total
+
+def registrar_sesion(usuario_id, ttl=TTL_SESION):
+    """
+    Registra la sesión de un usuario (o la renueva si ya estaba conectado).
+    """
+    return r.zadd(CLAVE_CONECTADOS, {usuario_id: time.time() + ttl})
+
+# Renueva una sesión solo si sigue vigente, en una sola operación: una que vence entre la
+# comprobación y la escritura no se renueva. KEYS: conectados. ARGV: usuario, ahora, vencimiento
+SCRIPT_RENOVAR_SESION = """
+local puntaje = redis.call('zscore', KEYS[1], ARGV[1])
+if not puntaje or tonumber(puntaje) <= tonumber(ARGV[2]) then
+    return 0
+end
+redis.call('zadd', KEYS[1], 'XX', ARGV[3], ARGV[1])
+return 1
+"""
+
+def renovar_sesion(usuario_id, ttl=TTL_SESION):
+    """
+    Heartbeat: extiende la sesión de un usuario solo si sigue conectado.
+
+    Retorna:
+        True si la sesión estaba vigente y se renovó
+    """
+    ahora = time.time()
+    return bool(r.eval(SCRIPT_RENOVAR_SESION, 1, CLAVE_CONECTADOS, usuario_id, ahora, ahora + ttl))
+
+def cerrar_sesion(usuario_id):
+    """
+    Quita a un usuario de los conectados.
+    """
+    return r.zrem(CLAVE_CONECTADOS, usuario_id)
+
+def contar_usuarios_conectados():
+    """
+    Devuelve la cantidad de usuarios con la sesión vigente (ZCOUNT, O(log n)).
+    """
+    return r.zcount(CLAVE_CONECTADOS, f"({time.time()}", "+inf")
+
+@instrumentar("redis")
+def limpiar_sesiones_vencidas(tamano_lote=1000):
+    """
+    Quita del sorted set las sesiones vencidas de a lotes, para no bloquear el servidor
+    con un único borrado grande.
+
+    Retorna:
+        cantidad de sesiones quitadas
+    """
+    ahora = time.time()
+    total = 0
+    while True:
+        vencidas = r.zrangebyscore(CLAVE_CONECTADOS, "-inf", ahora, start=0, num=tamano_lote)
+        if not vencidas:
+            return total
+        r.zrem(CLAVE_CONECTADOS, *vencidas)
+        registrar_lote("redis", filas=len(vencidas), viajes=2)
+        total += len(vencidas)
+        if len(vencidas) < tamano_lote:
+            return total
+
+@instrumentar("redis")
+def guardar_usuarios_conectados(df, cantidad=10, ttl=TTL_SESION):
     """
     Elige aleatoriamente `cantidad` usuarios del DataFrame
     y los guarda en Redis como conectados.
@@ -48,30 +388,383 @@ def guardar_usuarios_conectados(df, cantidad=10):
     Parametros:
         df: Dataframe con los datos
         cantidad: cantidad de usuario a almacenar. Por defecto 10
+        ttl: segundos hasta que vence cada sesión. Por defecto 1hs
     """  
     if df is None or df.empty:
         return None
 
     # Elige aleatoriamente sin repetir
     seleccionados = df.sample(n=min(cantidad, len(df)), random_state=42)
-    filas = seleccionados.to_dict(orient="records")
 
-    for fila in filas:
-        r.set(f"usuario:{fila['usuario_id']}:sesion", "activa", ex=3600) #Expira en 1hs
+    limpiar_sesiones_vencidas()
+    return registrar_sesiones(seleccionados["usuario_id"].tolist(), ttl)
+
+def contar_claves(patron, tamano_lote=1000):
+    """
+    Cuenta las claves que cumplen un patrón recorriendo el keyspace con SCAN
+    (no bloquea el servidor como KEYS).
+
+    Parametros:
+        patron: patrón de las claves (ej. 'reserva_temp:*')
+        tamano_lote: sugerencia de claves revisadas por cada SCAN
+    """
+    return sum(1 for _ in r.scan_iter(match=patron, count=tamano_lote))
+
+def listar_claves_paginado(patron, cursor=0, tamano_pagina=100):
+    """
+    Devuelve una página de claves que cumplen un patrón usando SCAN.
+
+    Parametros:
+        patron: patrón de las claves (ej. 'reserva_temp:*')
+        cursor: cursor devuelto por la página anterior (0 para la primera)
+        tamano_pagina: cantidad aproximada de claves por página
+    Retorna:
+        tupla (cursor siguiente, lista de claves). El cursor vale 0 cuando no hay más páginas.
+    """
+    claves = []
+    while True:
+        cursor, lote = r.scan(cursor=cursor, match=patron, count=tamano_pagina)
+        claves.extend(lote)
+        if cursor == 0 or len(claves) >= tamano_pagina:
+            return cursor, claves
+
+def _valores_y_ttl(claves, comando):
+    """
+    Trae en un solo pipeline el valor (con el comando indicado: 'get', 'hgetall') y el TTL de cada clave.
+    """
+    with r.pipeline(transaction=False) as pipe:
+        for clave in claves:
+            getattr(pipe, comando)(clave)
+            pipe.ttl(clave)
+        respuestas = pipe.execute()
+    registrar_lote("redis", filas=len(claves))
+    return list(zip(claves, respuestas[0::2], respuestas[1::2]))
+
+@instrumentar("redis")
+def listar_usuarios_conectados(cursor=0, tamano_pagina=100):
+    """
+    Devuelve una página de usuarios conectados, del más reciente al más antiguo
+    (el de sesión renovada más recientemente primero).
+
+    El cursor es el último usuario devuelto con su puntaje: la página siguiente empieza justo
+    después de él por rango (O(log n) por página), aunque otras sesiones se renueven o venzan
+    entre páginas. Si ese usuario cambió, se sigue por puntaje desde el suyo.
+
+    Parametros:
+        cursor: cursor devuelto por la página anterior (0 para la primera)
+        tamano_pagina: cantidad de usuarios por página
+    Retorna:
+        tupla (cursor siguiente, lista de diccionarios con usuario_id, estado y ttl).
+        El cursor vale 0 cuando no hay más páginas.
+    """
+    ahora = time.time()
+    if not cursor:
+        miembros = r.zrevrangebyscore(CLAVE_CONECTADOS, "+inf", f"({ahora}",
+                                      start=0, num=tamano_pagina, withscores=True)
+        registrar_lote("redis", filas=len(miembros))
+    else:
+        puntaje, ultimo = cursor
+        with r.pipeline(transaction=False) as pipe:
+            pipe.zscore(CLAVE_CONECTADOS, ultimo)
+            pipe.zrevrank(CLAVE_CONECTADOS, ultimo)
+            actual, posicion = pipe.execute()
+        if actual == puntaje:
+            miembros = r.zrevrange(CLAVE_CONECTADOS, posicion + 1, posicion + tamano_pagina, withscores=True)
+            miembros = [(usuario_id, vence) for usuario_id, vence in miembros if vence > ahora]
+            registrar_lote("redis", filas=len(miembros), viajes=2)
+        else:
+            miembros = _conectados_despues_de(puntaje, ultimo, ahora, tamano_pagina)
+
+    usuarios = [
+        {"usuario_id": usuario_id, "estado": "activa", "ttl": int(vence - ahora)}
+        for usuario_id, vence in miembros
+    ]
+    siguiente = (miembros[-1][1], miembros[-1][0]) if len(miembros) == tamano_pagina else 0
+    return siguiente, usuarios
+
+def _conectados_despues_de(puntaje, ultimo, ahora, cantidad):
+    """
+    Usuarios conectados que van después de (puntaje, ultimo) en listar_usuarios_conectados cuando
+    ese usuario ya no tiene ese puntaje. Con el mismo puntaje, el orden es de mayor a menor usuario.
+    """
+    miembros, desde = [], 0
+    while len(miembros) < cantidad:
+        lote = r.zrevrangebyscore(CLAVE_CONECTADOS, puntaje, f"({ahora}",
+                                  start=desde, num=cantidad, withscores=True)
+        registrar_lote("redis", filas=len(lote))
+        miembros += [(usuario_id, vence) for usuario_id, vence in lote
+                     if vence < puntaje or usuario_id < ultimo]
+        if len(lote) < cantidad:
+            break
+        desde += len(lote)
+    return miembros[:cantidad]
+
+def listar_reservas_temporales(cursor=0, tamano_pagina=100):
+    """
+    Devuelve una página de reservas temporales con sus datos y TTL.
+
+    Parametros:
+        cursor: cursor devuelto por la página anterior (0 para la primera)
+        tamano_pagina: cantidad aproximada de reservas por página
+    Retorna:
+        tupla (cursor siguiente, lista de diccionarios con clave, datos y ttl)
+    """
+    cursor, claves = listar_claves_paginado(patron_reservas_temporales(), cursor, tamano_pagina)
+    reservas = [
+        {"clave": clave, "datos": datos, "ttl": ttl}
+        for clave, datos, ttl in _valores_y_ttl(claves, "hgetall")
+        if datos
+    ]
+    return cursor, reservas
+
+def obtener_version_cache(tipo):
+    """
+    Devuelve la versión vigente de la caché de búsquedas de un tipo (0 si nunca se invalidó).
 
-    return len(filas)
+    Parametros:
+        tipo: 'destinos', 'hoteles', 'actividades'
+    """
+    registrar_lote("redis")
+    return int(r.get(f"version_cache:{tipo}") or 0)
+
+@instrumentar("redis")
+def invalidar_cache(tipo):
+    """
+    Invalida en O(1) todas las búsquedas cacheadas de un tipo incrementando su versión.
+    Las claves viejas dejan de leerse y expiran solas por su TTL.
+
+    Parametros:
+        tipo: 'destinos', 'hoteles', 'actividades'
+    Retorna:
+        nueva versión de la caché del tipo
+    """
+    registrar_lote("redis")
+    return r.incr(f"version_cache:{tipo}")
+
+def armar_clave_cache(tipo, version, parametros):
+    """
+    Arma la clave de una búsqueda cacheada para una versión dada del tipo.
+    """
+    partes = [f"{k}:{v}" for k, v in sorted(parametros.items())]
+    return f"busqueda:{tipo}:v{version}:" + "|".join(partes)
 
 def generar_clave_cache(tipo, parametros):
     """
     Genera una clave única para búsquedas cacheadas.
+    La clave incluye la versión vigente del tipo, así una invalidación no requiere borrar claves.
 
     Parametros:
         tipo: 'destinos', 'hoteles', 'actividades'
         parametros: diccionario con filtros
     """
-    partes = [f"{k}:{v}" for k, v in sorted(parametros.items())]
-    return f"busqueda:{tipo}:" + "|".join(partes)
+    return armar_clave_cache(tipo, obtener_version_cache(tipo), parametros)
+
+# Los valores se guardan en binario (por el cliente db_redis_binario): un byte de formato
+# seguido de JSON compacto, comprimido con zlib cuando supera CACHE_UMBRAL_COMPRESION.
+# Un resultado más grande que CACHE_MAX_BYTES_ENTRADA se guarda en páginas ('<clave>:p<n>')
+# con un índice en la clave principal, se trunca o no se guarda (CACHE_POLITICA_EXCESO).
+# Cada tipo tiene además un presupuesto total de bytes (CACHE_PRESUPUESTO_TIPO), compartido por
+# todas sus versiones: las entradas de versiones invalidadas siguen ocupando memoria hasta vencer.
+CACHE_UMBRAL_COMPRESION = 1024
+CACHE_MAX_BYTES_ENTRADA = 512 * 1024
+CACHE_PRESUPUESTO_TIPO = 32 * 1024 * 1024
+CACHE_POLITICA_EXCESO = "paginar"  # 'paginar', 'truncar' u 'omitir'
+
+_FORMATO_JSON = b"\x00"
+_FORMATO_ZLIB = b"\x01"
+_FORMATO_INDICE = b"\x02"
+# Marca que deja guardar_en_cache cuando el resultado no entra (omitido o sin presupuesto), para
+# que quien lo busque consulte directo en lugar de esperar una reconstrucción que no va a llegar
+MARCA_SIN_CACHE = b"\x03"
+
+# Reserva en el presupuesto del tipo los bytes de una entrada. Lleva el tamaño de cada clave
+# (hash) y su vencimiento (sorted set) para descontar las vencidas antes de decidir.
+# KEYS: vencimientos, tamaños, total. ARGV: ahora, clave, tamaño, vencimiento, presupuesto, ttl
+SCRIPT_PRESUPUESTO_CACHE = """
+local vencidas = redis.call('zrangebyscore', KEYS[1], '-inf', ARGV[1])
+for _, clave in ipairs(vencidas) do
+    redis.call('decrby', KEYS[3], tonumber(redis.call('hget', KEYS[2], clave) or '0'))
+    redis.call('hdel', KEYS[2], clave)
+end
+if #vencidas > 0 then
+    redis.call('zremrangebyscore', KEYS[1], '-inf', ARGV[1])
+end
+local anterior = tonumber(redis.call('hget', KEYS[2], ARGV[2]) or '0')
+local total = tonumber(redis.call('get', KEYS[3]) or '0') - anterior + tonumber(ARGV[3])
+if total > tonumber(ARGV[5]) then
+    return 0
+end
+redis.call('incrby', KEYS[3], tonumber(ARGV[3]) - anterior)
+redis.call('hset', KEYS[2], ARGV[2], ARGV[3])
+redis.call('zadd', KEYS[1], ARGV[4], ARGV[2])
+for i = 1, 3 do
+    if redis.call('ttl', KEYS[i]) < tonumber(ARGV[6]) then
+        redis.call('expire', KEYS[i], ARGV[6])
+    end
+end
+return 1
+"""
+
+def normalizar_resultado_cache(resultado):
+    """
+    Pasa a texto el _id de cada documento, como queda al decodificarlo de la caché, para que
+    una búsqueda devuelva lo mismo tanto si viene de MongoDB como de Redis.
+    """
+    for documento in resultado:
+        if "_id" in documento:
+            documento["_id"] = str(documento["_id"])
+    return resultado
+
+def codificar_cache(valor):
+    """
+    Codifica un valor para la caché: JSON compacto, comprimido si supera el umbral.
+    """
+    datos = json.dumps(valor, separators=(",", ":"), ensure_ascii=False, default=str).encode("utf-8")
+    if len(datos) > CACHE_UMBRAL_COMPRESION:
+        comprimido = zlib.compress(datos, 1)
+        if len(comprimido) < len(datos):
+            return _FORMATO_ZLIB + comprimido
+    return _FORMATO_JSON + datos
 
+def decodificar_cache(crudo):
+    """
+    Decodifica un valor de la caché (también los JSON guardados antes del formato binario).
+    """
+    formato, datos = crudo[:1], crudo[1:]
+    if formato == _FORMATO_ZLIB:
+        datos = zlib.decompress(datos)
+    elif formato not in (_FORMATO_JSON, _FORMATO_INDICE):
+        datos = crudo
+    return json.loads(datos)
+
+def es_indice_cache(crudo):
+    """Indica si un valor de la caché es el índice de un resultado paginado."""
+    return crudo[:1] == _FORMATO_INDICE
+
+def es_sin_cache(crudo):
+    """Indica si un valor de la caché es la marca de un resultado que no se pudo guardar."""
+    return crudo == MARCA_SIN_CACHE
+
+def es_resultado_incompleto(crudo):
+    """
+    Indica si la clave tiene un resultado que no se puede leer completo de la caché: la marca
+    de un resultado no guardado o el índice de uno truncado.
+    """
+    if crudo is None:
+        return False
+    return es_sin_cache(crudo) or (es_indice_cache(crudo) and decodificar_cache(crudo)["truncado"])
+
+def clave_pagina_cache(clave, pagina):
+    """Devuelve la clave de una página de un resultado paginado."""
+    return f"{clave}:p{pagina}"
+
+def armar_entradas_cache(clave, resultado, max_bytes=None, politica=None):
+    """
+    Codifica un resultado y devuelve las entradas a guardar, respetando el tamaño máximo por entrada.
+
+    Parametros:
+        clave: clave de la búsqueda
+        resultado: lista con los resultados
+        max_bytes (opcional): tamaño máximo de cada entrada. Por defecto CACHE_MAX_BYTES_ENTRADA
+        politica (opcional): qué hacer con un resultado más grande. Por defecto CACHE_POLITICA_EXCESO
+            'paginar': se guarda completo en páginas; 'truncar': se guardan solo las primeras
+            páginas hasta max_bytes; 'omitir': no se guarda
+    Retorna:
+        lista de tuplas (clave, valor codificado); vacía si el resultado no se guarda
+    """
+    max_bytes = max_bytes or CACHE_MAX_BYTES_ENTRADA
+    politica = politica or CACHE_POLITICA_EXCESO
+    valor = codificar_cache(resultado)
+    if len(valor) <= max_bytes:
+        return [(clave, valor)]
+    if politica == "omitir" or not isinstance(resultado, list):
+        return []
+
+    # Páginas de tamaño parejo estimadas a partir del tamaño total, con margen
+    por_pagina = max(1, len(resultado) * max_bytes // (2 * len(valor)))
+    paginas, guardados, usados = [], 0, 0
+    for inicio in range(0, len(resultado), por_pagina):
+        pagina = codificar_cache(resultado[inicio:inicio + por_pagina])
+        if len(pagina) > max_bytes or (politica == "truncar" and usados + len(pagina) > max_bytes):
+            if politica != "truncar" or not paginas:
+                return []
+            break
+        paginas.append(pagina)
+        guardados += len(resultado[inicio:inicio + por_pagina])
+        usados += len(pagina)
+
+    indice = {"paginas": len(paginas), "por_pagina": por_pagina, "total": len(resultado),
+              "truncado": guardados < len(resultado)}
+    entradas = [(clave, _FORMATO_INDICE + json.dumps(indice).encode("utf-8"))]
+    entradas += [(clave_pagina_cache(clave, i), pagina) for i, pagina in enumerate(paginas)]
+    return entradas
+
+def argumentos_presupuesto(tipo, clave, tamano, ttl, presupuesto=None):
+    """
+    Devuelve los argumentos de EVAL para SCRIPT_PRESUPUESTO_CACHE. El presupuesto es uno por
+    tipo: invalidar la caché no lo reinicia.
+    """
+    prefijo = f"cache_presupuesto:{tipo}"
+    ahora = time.time()
+    return (3, f"{prefijo}:vencimientos", f"{prefijo}:tamanos", f"{prefijo}:total",
+            ahora, clave, tamano, ahora + ttl, presupuesto or CACHE_PRESUPUESTO_TIPO, ttl)
+
+def preparar_guardado_cache(tipo, clave, resultado, ttl, max_bytes=None, politica=None):
+    """
+    Arma lo que guardar_en_cache (y su versión async) envía a Redis, sin consultarlo.
+
+    Retorna:
+        tupla (entradas, argumentos): las entradas a escribir, con las páginas antes que el
+        índice que las referencia, y los argumentos de EVAL para SCRIPT_PRESUPUESTO_CACHE.
+        Si el resultado no se guarda, entradas es una lista vacía y argumentos None
+    """
+    entradas = armar_entradas_cache(clave, resultado, max_bytes, politica)
+    if not entradas:
+        return [], None
+    tamano = sum(len(valor) for _, valor in entradas)
+    return entradas[1:] + entradas[:1], argumentos_presupuesto(tipo, clave, tamano, ttl)
+
+def interpretar_valor_cache(clave, crudo):
+    """
+    Interpreta el valor crudo de una búsqueda cacheada sin consultar Redis.
+
+    Retorna:
+        tupla (resultado, claves de páginas). Si es un índice, resultado es None y hay que traer
+        esas páginas (ver unir_paginas_cache). Si el resultado no está, no se guardó o está
+        truncado, ambos son None
+    """
+    if crudo is None or es_sin_cache(crudo):
+        return None, None
+    if not es_indice_cache(crudo):
+        return decodificar_cache(crudo), None
+
+    indice = decodificar_cache(crudo)
+    if indice["truncado"]:
+        return None, None
+    return None, [clave_pagina_cache(clave, i) for i in range(indice["paginas"])]
+
+def unir_paginas_cache(paginas):
+    """
+    Une las páginas leídas de un resultado paginado. Devuelve None si falta alguna.
+    """
+    if any(pagina is None for pagina in paginas):
+        return None
+    return [fila for pagina in paginas for fila in decodificar_cache(pagina)]
+
+def leer_valor_cache(clave, crudo):
+    """
+    Devuelve el resultado guardado en `clave` a partir de su valor crudo. Si es un índice,
+    trae todas las páginas en un solo viaje. Devuelve None si el resultado no se guardó,
+    está truncado o le falta alguna página.
+    """
+    resultado, claves_paginas = interpretar_valor_cache(clave, crudo)
+    if not claves_paginas:
+        return resultado
+    paginas = rb.mget(claves_paginas)
+    registrar_lote("redis")
+    return unir_paginas_cache(paginas)
+
+@instrumentar("redis")
 def obtener_cache(tipo, parametros):
     """
     Obtiene de redis la busqueda cacheada.
@@ -79,39 +772,109 @@ def obtener_cache(tipo, parametros):
     Parametros:
         tipo: 'destinos', 'hoteles', 'actividades'
         parametros: diccionario con filtros
+    Retorna:
+        lista completa de resultados, o None si no está (o se guardó truncada)
+    """
+    clave = generar_clave_cache(tipo, parametros)
+    resultado = leer_valor_cache(clave, rb.get(clave))
+    registrar_lote("redis")
+    registrar_cache(tipo, resultado is not None)
+    return resultado
+
+@instrumentar("redis")
+def obtener_cache_pagina(tipo, parametros, pagina=0):
+    """
+    Obtiene una página de una búsqueda cacheada (también de los resultados truncados).
+
+    Parametros:
+        tipo: 'destinos', 'hoteles', 'actividades'
+        parametros: diccionario con filtros
+        pagina: número de página, desde 0
+    Retorna:
+        diccionario con 'resultados', 'pagina', 'paginas', 'total' y 'truncado', o None si no está
     """
     clave = generar_clave_cache(tipo, parametros)
-    resultado = r.get(clave)
-    if resultado:
-        return json.loads(resultado)
-    return None
+    crudo = rb.get(clave)
+    registrar_lote("redis")
+    crudo = None if crudo is None or es_sin_cache(crudo) else crudo
+    registrar_cache(tipo, crudo is not None)
+    if crudo is None:
+        return None
+    if not es_indice_cache(crudo):
+        resultados = decodificar_cache(crudo)
+        if pagina != 0:
+            return None
+        return {"resultados": resultados, "pagina": 0, "paginas": 1, "total": len(resultados), "truncado": False}
+
+    indice = decodificar_cache(crudo)
+    if pagina >= indice["paginas"]:
+        return None
+    valor = rb.get(clave_pagina_cache(clave, pagina))
+    registrar_lote("redis")
+    if valor is None:
+        return None
+    return {"resultados": decodificar_cache(valor), "pagina": pagina, "paginas": indice["paginas"],
+            "total": indice["total"], "truncado": indice["truncado"]}
 
-def guardar_en_cache(tipo, parametros, resultado, ttl=600):
+@instrumentar("redis")
+def guardar_en_cache(tipo, parametros, resultado, ttl=600, max_bytes=None, politica=None, version=None):
     """
-    Guarda en cache los datos pasados por parametros
+    Guarda en cache los datos pasados por parametros, codificados y comprimidos (ver codificar_cache).
+    Si el resultado supera el tamaño máximo por entrada se pagina, se trunca o se omite, y si el
+    tipo ya usó su presupuesto de memoria no se guarda. Cuando no se guarda queda en su lugar
+    una marca por el mismo TTL (ver es_sin_cache).
 
     Parametros:
         tipo: 'destinos', 'hoteles', 'actividades'
         parametros: diccionario con filtros
         resultado: lista con los resultados de la búsqueda a guardar.
         ttl: tiempo de expiración de la busqueda
+        max_bytes (opcional): tamaño máximo por entrada. Por defecto CACHE_MAX_BYTES_ENTRADA
+        politica (opcional): 'paginar', 'truncar' u 'omitir'. Por defecto CACHE_POLITICA_EXCESO
+        version (opcional): versión de la caché leída antes de consultar la base. Si una escritura
+            la invalidó mientras tanto, el resultado queda en la versión vieja y no se sirve.
+            Por defecto la vigente
+    Retorna:
+        True si se guardó, False si no
     """
-    clave = generar_clave_cache(tipo, parametros)
+    if version is None:
+        version = obtener_version_cache(tipo)
+    clave = armar_clave_cache(tipo, version, parametros)
     try:
-        return r.set(clave, json.dumps(resultado), ex=ttl)
+        entradas, argumentos = preparar_guardado_cache(tipo, clave, resultado, ttl, max_bytes, politica)
+        # El presupuesto se reserva con un EVAL solo si hay algo para guardar
+        registrar_lote("redis", viajes=1 if entradas else 0)
+        if not entradas or not r.eval(SCRIPT_PRESUPUESTO_CACHE, *argumentos):
+            rb.set(clave, MARCA_SIN_CACHE, ex=ttl)
+            registrar_lote("redis")
+            return False
+
+        with rb.pipeline(transaction=False) as pipe:
+            for clave_entrada, valor in entradas:
+                pipe.set(clave_entrada, valor, ex=ttl)
+            pipe.execute()
+        registrar_lote("redis", filas=len(resultado))
+        return True
     except Exception:
         return False
 
-def insertar_en_redis(nombre_coleccion, df):
+@instrumentar("redis")
+def insertar_en_redis(nombre_coleccion, df, primer_bloque=True, version_reservas=None):
     """
     Guarda datos en Redis (solo usuarios y reservas temporales).
 
     Parametros:
         nombre_colección: nombre de la colección en MongoDB 
         df: DataFrame con los datos a guardar.
+        primer_bloque: si es False (carga por bloques), no se vuelven a elegir usuarios conectados.
+        version_reservas (opcional): en una carga por bloques, versión reservada con
+            iniciar_recarga_reservas_temporales donde se escriben las reservas temporales;
+            se publica al terminar la carga. Sin versión, las reservas temporales se recargan.
+            Con versión, un error al escribirlas se vuelve a lanzar para que la carga descarte
+            la versión en lugar de publicarla incompleta.
     """
     
-    if nombre_coleccion == "usuarios":
+    if nombre_coleccion == "usuarios" and primer_bloque:
         try:
             conectados = guardar_usuarios_conectados(df, 15)
             print(f"✅ Se registran {conectados} usuarios conectados en Redis.")
@@ -121,10 +884,12 @@ def insertar_en_redis(nombre_coleccion, df):
     elif nombre_coleccion == "reservas":
         df_reservas_temporales = df[df["estado"].isna()]
         try:
-            resultado = carga_masiva_reservas_temporales(df_reservas_temporales)
+            resultado = carga_masiva_reservas_temporales(df_reservas_temporales, version=version_reservas)
             print(f"✅ Se insertaron {resultado} reservas temporales en Redis.")
         except Exception as e:
             print(f"⚠️ Error al cargar reservas temporales en Redis: {e}")
+            if version_reservas is not None:
+                raise
 
 
 
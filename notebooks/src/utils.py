@@ -1,11 +1,182 @@
 import pandas as pd
+import numpy as np
 from pathlib import Path
 import random
 from faker import Faker
 import os
+import ast
 from collections import defaultdict
-from itertools import combinations
+from itertools import combinations, islice
 
+#--------------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+#                                               Datos de input del generador
+#--------------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+PROVINCIAS_ARG = [
+    "Buenos Aires",
+    "Ciudad Autónoma de Buenos Aires",
+    "Catamarca",
+    "Chaco",
+    "Chubut",
+    "Córdoba",
+    "Corrientes",
+    "Entre Ríos",
+    "Formosa",
+    "Jujuy",
+    "La Pampa",
+    "La Rioja",
+    "Mendoza",
+    "Misiones",
+    "Neuquén",
+    "Río Negro",
+    "Salta",
+    "San Juan",
+    "San Luis",
+    "Santa Cruz",
+    "Santa Fe",
+    "Santiago del Estero",
+    "Tierra del Fuego",
+    "Tucumán"
+]
+CIUDADES_ARG = {
+    "Buenos Aires": ["La Plata", "Mar del Plata"],
+    "Ciudad Autónoma de Buenos Aires": ["CABA"],
+    "Catamarca": ["San Fernando"],
+    "Chaco": ["Resistencia"],
+    "Chubut": ["Puerto Madryn"],
+    "Córdoba": ["Córdoba", "Villa Carlos Paz", "Río Cuarto"],
+    "Corrientes": ["Corrientes"],
+    "Entre Ríos": ["Paraná", "Concordia", "Gualeguaychú"],
+    "Formosa": ["Formosa"],
+    "Jujuy": ["San Salvador de Jujuy"],
+    "La Pampa": ["Santa Rosa"],
+    "La Rioja": ["La Rioja", "Chilecito",],
+    "Mendoza": ["Mendoza", "San Rafael"],
+    "Misiones": ["Posadas", "Iguazú"],
+    "Neuquén": ["Neuquén", "San Martín de los Andes"],
+    "Río Negro": ["Bariloche", "Viedma"],
+    "Salta": ["Salta"],
+    "San Juan": ["San Juan"],
+    "San Luis": ["San Luis", "Merlo"],
+    "Santa Cruz": ["Río Gallegos", "El Calafate"],
+    "Santa Fe": ["Rosario", "Santa Fe"],
+    "Santiago del Estero": ["Santiago del Estero"],
+    "Tierra del Fuego": ["Ushuaia"],
+    "Tucumán": ["San Miguel de Tucumán"]
+}
+TIPOS_DESTINO = ["Cultural", "Playa", "Montaña", "Aventura", "Relax"]
+NOMBRE_ACTIVIDAD = [
+    "Visita guiada a ciudad",
+    "Tour gastronómico local",
+    "Caminata por parque",
+    "Paseo en bicicleta",
+    "Clase de yoga o meditación",
+    "Excursión a sitio turístico cercano",
+    "Recorrido cultural o histórico",
+    "Actividad de bienestar en spa",
+    "Clase de cocina típica",
+    "Participación en evento o festival local"
+]
+TIPOS_ACTIVIDAD = ["aventura", "cultural",
+                   "gastronómica", "relax", "deportiva"]
+SERVICIOS_POSIBLES = ["wifi", "spa", "pileta",
+                      "desayuno", "gimnasio", "restaurant"]
+ESTADOS_RESERVA = ["Confirmada", "Pagada", "Pendiente", "Cancelada", ""]
+
+
+#--------------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+#                                               Esquema de las fuentes
+#--------------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+# Tipos de cada CSV de 'fuentes': ids enteros, categorías para los campos con pocos valores,
+# fechas nativas y columnas con listas reales (en el CSV se guardan como texto "['a', 'b']")
+ESQUEMAS_FUENTES = {
+    "usuarios.csv": {
+        "tipos": {"usuario_id": "int64", "nombre": "object", "apellido": "object",
+                  "email": "object", "telefono": "object"},
+    },
+    "destinos.csv": {
+        "tipos": {"destino_id": "int64", "provincia": "category", "ciudad": "object",
+                  "pais": "category", "tipo": "category", "precio_promedio": "int64"},
+    },
+    "hoteles.csv": {
+        "tipos": {"hotel_id": "int64", "nombre": "object", "ciudad": "object",
+                  "provincia": "category", "precio": "int64", "calificacion": "int64"},
+        "listas": ["servicios"],
+    },
+    "actividades.csv": {
+        "tipos": {"actividad_id": "int64", "nombre": "category", "tipo": "category",
+                  "ciudad": "object", "provincia": "category", "precio": "int64"},
+    },
+    "reservas.csv": {
+        "tipos": {"reserva_id": "int64", "usuario_id": "int64", "destino_id": "int64",
+                  "hotel_id": "int64", "estado": "category", "precio_total": "int64"},
+        "fechas": ["fecha_reserva"],
+    },
+    "usuarios_relaciones.csv": {
+        "tipos": {"usuario1": "int64", "usuario2": "int64", "tipo": "category"},
+    },
+}
+
+def texto_a_lista(valor):
+    """
+    Convierte una lista guardada como texto en el CSV ("['wifi', 'spa']") en una lista.
+    Un campo vacío se toma como lista vacía.
+    """
+    if isinstance(valor, str):
+        return ast.literal_eval(valor) if valor.startswith("[") else ([] if not valor.strip() else valor)
+    return valor
+
+def _opciones_lectura(nombre_archivo):
+    """
+    Devuelve los argumentos de pd.read_csv que aplican el esquema de un archivo de 'fuentes'.
+    """
+    esquema = ESQUEMAS_FUENTES.get(nombre_archivo, {})
+    return {
+        "dtype": esquema.get("tipos"),
+        "parse_dates": esquema.get("fechas") or False,
+        "converters": {columna: texto_a_lista for columna in esquema.get("listas", [])} or None,
+    }
+
+def leer_fuente(nombre_archivo, usar_snapshot=True, carpeta="fuentes"):
+    """
+    Lee un CSV de 'fuentes' aplicando su esquema (ESQUEMAS_FUENTES).
+
+    La primera lectura guarda una copia en Parquet ('fuentes/.snapshots') junto con la firma
+    (tamaño y fecha de modificación) del CSV. Mientras el CSV no cambie, las lecturas
+    siguientes usan el Parquet y no vuelven a parsear el archivo.
+
+    Parametros:
+        nombre_archivo: nombre del CSV dentro de 'fuentes'
+        usar_snapshot: si es False, siempre se lee el CSV (y se regenera el snapshot)
+        carpeta: carpeta donde está el CSV. Por defecto 'fuentes'
+    Retorna:
+        DataFrame tipado, o None si el archivo no existe
+    """
+    ruta = Path(carpeta) / nombre_archivo
+    if not ruta.exists():
+        print("⚠️ No se encontró el archivo en:", ruta)
+        return None
+
+    carpeta_snapshots = ruta.parent / ".snapshots"
+    snapshot = carpeta_snapshots / f"{ruta.stem}.parquet"
+    ruta_firma = carpeta_snapshots / f"{ruta.stem}.firma"
+    estado = ruta.stat()
+    firma = f"{estado.st_size}-{estado.st_mtime_ns}"
+
+    listas = ESQUEMAS_FUENTES.get(nombre_archivo, {}).get("listas", [])
+    if usar_snapshot and snapshot.exists() and ruta_firma.exists() and ruta_firma.read_text() == firma:
+        df = pd.read_parquet(snapshot)
+        # Parquet devuelve las listas como arrays de NumPy
+        for columna in listas:
+            df[columna] = df[columna].map(lambda x: list(x) if x is not None else x)
+        return df
+
+    df = pd.read_csv(ruta, **_opciones_lectura(nombre_archivo))
+    os.makedirs(carpeta_snapshots, exist_ok=True)
+    df.to_parquet(snapshot, index=False)
+    ruta_firma.write_text(firma)
+    return df
 
 def lectura_csv(ruta):
     """
@@ -21,14 +192,46 @@ def lectura_csv(ruta):
 def procesar_csv(nombre_archivo):
     """
     Lee un CSV desde la carpeta 'fuentes' y devuelve un DataFrame si tiene datos.
+    Usa el esquema y el snapshot Parquet de leer_fuente.
     """
-    ruta = Path("fuentes") / nombre_archivo
-    df = lectura_csv(ruta)
+    df = leer_fuente(nombre_archivo)
     if df is None or df.empty:
         print(f"⚠️ Archivo {nombre_archivo} vacío o no encontrado.")
         return None
     return df
 
+def procesar_csv_por_bloques(nombre_archivo, tamano_bloque=50000):
+    """
+    Lee un CSV desde la carpeta 'fuentes' de a bloques de `tamano_bloque` filas
+    y devuelve cada bloque como un DataFrame, sin cargar el archivo completo en memoria.
+    """
+    ruta = Path("fuentes") / nombre_archivo
+    if not ruta.exists():
+        print("⚠️ No se encontró el archivo en:", ruta)
+        return
+
+    for bloque in pd.read_csv(ruta, chunksize=tamano_bloque, **_opciones_lectura(nombre_archivo)):
+        if not bloque.empty:
+            yield bloque
+
+def dividir_en_lotes(iterable, tamano_lote):
+    """
+    Recorre un iterable y devuelve sus elementos agrupados en listas de a `tamano_lote`.
+
+    Parametros:
+        iterable: secuencia o generador con los elementos a agrupar
+        tamano_lote: cantidad máxima de elementos por lote (mayor a 0)
+    """
+    if tamano_lote <= 0:
+        raise ValueError("El parámetro 'tamano_lote' debe ser mayor a 0.")
+
+    iterador = iter(iterable)
+    while True:
+        lote = list(islice(iterador, tamano_lote))
+        if not lote:
+            return
+        yield lote
+
 def generar_csv_datos_ficticios():
     """
     Genera datasets de Actividades, Destinos, Hoteles, Reservas, Usuarios_relaciones y Usuarios con datos ficticios.
@@ -40,80 +243,6 @@ def generar_csv_datos_ficticios():
     Faker.seed(42)
     random.seed(42)
     
-    # -----------------------------
-    # Datos de input
-    # -----------------------------
-    provincias_arg = [
-        "Buenos Aires",
-        "Ciudad Autónoma de Buenos Aires",
-        "Catamarca",
-        "Chaco",
-        "Chubut",
-        "Córdoba",
-        "Corrientes",
-        "Entre Ríos",
-        "Formosa",
-        "Jujuy",
-        "La Pampa",
-        "La Rioja",
-        "Mendoza",
-        "Misiones",
-        "Neuquén",
-        "Río Negro",
-        "Salta",
-        "San Juan",
-        "San Luis",
-        "Santa Cruz",
-        "Santa Fe",
-        "Santiago del Estero",
-        "Tierra del Fuego",
-        "Tucumán"
-    ]
-    ciudades_arg = {
-        "Buenos Aires": ["La Plata", "Mar del Plata"],
-        "Ciudad Autónoma de Buenos Aires": ["CABA"],
-        "Catamarca": ["San Fernando"],
-        "Chaco": ["Resistencia"],
-        "Chubut": ["Puerto Madryn"],
-        "Córdoba": ["Córdoba", "Villa Carlos Paz", "Río Cuarto"],
-        "Corrientes": ["Corrientes"],
-        "Entre Ríos": ["Paraná", "Concordia", "Gualeguaychú"],
-        "Formosa": ["Formosa"],
-        "Jujuy": ["San Salvador de Jujuy"],
-        "La Pampa": ["Santa Rosa"],
-        "La Rioja": ["La Rioja", "Chilecito",],
-        "Mendoza": ["Mendoza", "San Rafael"],
-        "Misiones": ["Posadas", "Iguazú"],
-        "Neuquén": ["Neuquén", "San Martín de los Andes"],
-        "Río Negro": ["Bariloche", "Viedma"],
-        "Salta": ["Salta"],
-        "San Juan": ["San Juan"],
-        "San Luis": ["San Luis", "Merlo"],
-        "Santa Cruz": ["Río Gallegos", "El Calafate"],
-        "Santa Fe": ["Rosario", "Santa Fe"],
-        "Santiago del Estero": ["Santiago del Estero"],
-        "Tierra del Fuego": ["Ushuaia"],
-        "Tucumán": ["San Miguel de Tucumán"]
-    }
-    tipos_destino = ["Cultural", "Playa", "Montaña", "Aventura", "Relax"]
-    nombre_actividad = [
-        "Visita guiada a ciudad",
-        "Tour gastronómico local",
-        "Caminata por parque",
-        "Paseo en bicicleta",
-        "Clase de yoga o meditación",
-        "Excursión a sitio turístico cercano",
-        "Recorrido cultural o histórico",
-        "Actividad de bienestar en spa",
-        "Clase de cocina típica",
-        "Participación en evento o festival local"
-    ]
-    tipos_actividad = ["aventura", "cultural",
-                       "gastronómica", "relax", "deportiva"]
-    servicios_posibles = ["wifi", "spa", "pileta",
-                          "desayuno", "gimnasio", "restaurant"]
-    estados_reserva = ["Confirmada", "Pagada", "Pendiente", "Cancelada", ""]
-    
     # ----------------------------
     # Parametros del generador
     # -----------------------------
@@ -142,14 +271,14 @@ def generar_csv_datos_ficticios():
     destinos = []
     destino_id = 1
     
-    for provincia in provincias_arg:
-        for ciudad in ciudades_arg[provincia]:
+    for provincia in PROVINCIAS_ARG:
+        for ciudad in CIUDADES_ARG[provincia]:
             destinos.append({
                 "destino_id": destino_id,
                 "provincia": provincia,
                 "ciudad": ciudad,
                 "pais": "Argentina",
-                "tipo": random.choice(tipos_destino),
+                "tipo": random.choice(TIPOS_DESTINO),
                 "precio_promedio": random.randint(50000, 200000)
             })
             destino_id += 1
@@ -169,7 +298,7 @@ def generar_csv_datos_ficticios():
                 "provincia": destino["provincia"],
                 "precio": random.randint(80000, 300000),
                 "calificacion": random.randint(1, 5),
-                "servicios": random.sample(servicios_posibles, random.randint(2, 4))
+                "servicios": random.sample(SERVICIOS_POSIBLES, random.randint(2, 4))
             })
             hotel_id += 1
     
@@ -184,8 +313,8 @@ def generar_csv_datos_ficticios():
         for _ in range(n_actividades_ciudad):
             actividades.append({
                 "actividad_id": actividad_id,
-                "nombre": random.choice(nombre_actividad),
-                "tipo": random.choice(tipos_actividad),
+                "nombre": random.choice(NOMBRE_ACTIVIDAD),
+                "tipo": random.choice(TIPOS_ACTIVIDAD),
                 "ciudad": destino["ciudad"],
                 "provincia": destino["provincia"],
                 "precio": random.randint(20000, 80000)
@@ -225,7 +354,7 @@ def generar_csv_datos_ficticios():
                 "destino_id": destino_id,
                 "hotel_id": hotel["hotel_id"],
                 "fecha_reserva": fake.date_between(start_date="-1y", end_date="+6m").isoformat(),
-                "estado": random.choice(estados_reserva),
+                "estado": random.choice(ESTADOS_RESERVA),
                 # pequeña variación
                 "precio_total": destino_precio + random.randint(-10000, 10000)
             })
@@ -252,7 +381,7 @@ def generar_csv_datos_ficticios():
                     "destino_id": destino_info["id"],
                     "hotel_id": random.choice([h["hotel_id"] for h in hoteles if h["ciudad"] == ciudad]),
                     "fecha_reserva": fake.date_between(start_date="-1y", end_date="+6m").isoformat(),
-                    "estado": random.choice(estados_reserva),
+                    "estado": random.choice(ESTADOS_RESERVA),
                     "precio_total": destino_info["precio"] + random.randint(-10000, 10000)
                 })
                 reserva_id += 1
@@ -326,4 +455,180 @@ def generar_csv_datos_ficticios():
     pd.DataFrame(relaciones).to_csv(
         f"{carpeta_destino}/usuarios_relaciones.csv", index=False, encoding="utf-8")
     #print(f"Se generaron {len(relaciones)} relaciones para {len(usuario_ids)} usuarios.")
-    print(f"✅ Archivos generados correctamente en {carpeta_destino}")
\ No newline at end of file
+    print(f"✅ Archivos generados correctamente en {carpeta_destino}")
+
+
+def _escribir_bloque_csv(df, ruta, primer_bloque):
+    """
+    Escribe un bloque en el CSV indicado; el primer bloque crea el archivo con encabezado
+    y los siguientes se agregan al final.
+    """
+    df.to_csv(ruta, mode="w" if primer_bloque else "a", header=primer_bloque,
+              index=False, encoding="utf-8")
+
+def _normalizar_texto(serie):
+    """
+    Pasa un texto a minúsculas, sin tildes ni espacios (para armar emails).
+    """
+    return (serie.str.normalize("NFKD").str.encode("ascii", "ignore").str.decode("ascii")
+            .str.lower().str.replace(r"[^a-z]", "", regex=True))
+
+def generar_csv_datos_masivos(n_usuarios=1_000_000, n_reservas=50_000_000, n_hoteles=5,
+                              n_actividades=3, n_relaciones=None, max_amigos=8,
+                              max_familiares=2, tamano_bloque=1_000_000, semilla=42,
+                              carpeta="fuentes", fecha_referencia="2025-01-01"):
+    """
+    Genera los mismos datasets que generar_csv_datos_ficticios, pero con tamaño configurable
+    para pruebas de carga. El muestreo se hace vectorizado con NumPy y los archivos grandes
+    (usuarios y reservas) se escriben de a bloques, por lo que la memoria no depende del total.
+
+    A diferencia del generador chico no se fuerza un mínimo de reservas por usuario:
+    los usuarios y hoteles de cada reserva se eligen de forma uniforme.
+
+    Parametros:
+        n_usuarios: cantidad de usuarios a generar
+        n_reservas: cantidad de reservas a generar
+        n_hoteles: máximo de hoteles por destino
+        n_actividades: cantidad de actividades por destino
+        n_relaciones (opcional): pares de usuarios candidatos a relacionarse. Por defecto 5 por usuario
+        max_amigos / max_familiares: máximo de relaciones de cada tipo por usuario
+        tamano_bloque: filas generadas y escritas por bloque
+        semilla: semilla para que la generación sea determinística
+        carpeta: carpeta donde se guardan los CSV
+        fecha_referencia: fecha ('AAAA-MM-DD') a partir de la cual se generan las fechas de reserva
+            (desde un año antes hasta seis meses después). Es fija para que la misma semilla genere
+            los mismos archivos cualquier día; para fechas relativas a hoy, pasar pd.Timestamp.today()
+    """
+    rng = np.random.default_rng(semilla)
+    fake = Faker('es_ES')
+    Faker.seed(semilla)
+
+    carpeta_destino = Path(carpeta)
+    os.makedirs(carpeta_destino, exist_ok=True)
+
+    # Pools de valores de Faker: se generan una sola vez y luego se muestrean con NumPy
+    nombres = pd.Series([fake.first_name() for _ in range(500)])
+    apellidos = pd.Series([fake.last_name() for _ in range(500)])
+    empresas = np.array([f"{fake.company()} Hotel" for _ in range(500)], dtype=object)
+    nombres_email = _normalizar_texto(nombres).to_numpy(dtype=object)
+    apellidos_email = _normalizar_texto(apellidos).to_numpy(dtype=object)
+    nombres = nombres.to_numpy(dtype=object)
+    apellidos = apellidos.to_numpy(dtype=object)
+
+    # -----------------------------
+    # Generar Usuarios
+    # -----------------------------
+    for inicio in range(0, n_usuarios, tamano_bloque):
+        ids = np.arange(inicio + 1, min(inicio + tamano_bloque, n_usuarios) + 1)
+        i_nombre = rng.integers(0, len(nombres), len(ids))
+        i_apellido = rng.integers(0, len(apellidos), len(ids))
+        emails = (pd.Series(nombres_email[i_nombre]) + "." + pd.Series(apellidos_email[i_apellido])
+                  + "." + pd.Series(ids).astype(str) + "@example.com")
+        telefonos = "+34 " + pd.Series(rng.integers(600_000_000, 700_000_000, len(ids))).astype(str)
+        _escribir_bloque_csv(pd.DataFrame({
+            "usuario_id": ids,
+            "nombre": nombres[i_nombre],
+            "apellido": apellidos[i_apellido],
+            "email": emails,
+            "telefono": telefonos
+        }), carpeta_destino / "usuarios.csv", inicio == 0)
+
+    # -----------------------------
+    # Generar Destinos
+    # -----------------------------
+    pares = [(provincia, ciudad) for provincia in PROVINCIAS_ARG for ciudad in CIUDADES_ARG[provincia]]
+    destinos = pd.DataFrame(pares, columns=["provincia", "ciudad"])
+    destinos.insert(0, "destino_id", np.arange(1, len(destinos) + 1))
+    destinos["pais"] = "Argentina"
+    destinos["tipo"] = rng.choice(TIPOS_DESTINO, len(destinos))
+    destinos["precio_promedio"] = rng.integers(50000, 200001, len(destinos))
+    destinos.to_csv(carpeta_destino / "destinos.csv", index=False, encoding="utf-8")
+
+    # -----------------------------
+    # Generar Hoteles
+    # -----------------------------
+    hoteles_por_destino = rng.integers(1, n_hoteles + 1, len(destinos))
+    i_destino_hotel = np.repeat(np.arange(len(destinos)), hoteles_por_destino)
+    n_total_hoteles = len(i_destino_hotel)
+
+    # Servicios: se ordena una matriz aleatoria por fila y se toman los primeros k
+    orden = np.argsort(rng.random((n_total_hoteles, len(SERVICIOS_POSIBLES))), axis=1)
+    k_servicios = rng.integers(2, 5, n_total_hoteles)
+    servicios = np.array(SERVICIOS_POSIBLES, dtype=object)
+    hoteles = pd.DataFrame({
+        "hotel_id": np.arange(1, n_total_hoteles + 1),
+        "nombre": empresas[rng.integers(0, len(empresas), n_total_hoteles)],
+        "ciudad": destinos["ciudad"].to_numpy()[i_destino_hotel],
+        "provincia": destinos["provincia"].to_numpy()[i_destino_hotel],
+        "precio": rng.integers(80000, 300001, n_total_hoteles),
+        "calificacion": rng.integers(1, 6, n_total_hoteles),
+        "servicios": [list(servicios[fila[:k]]) for fila, k in zip(orden, k_servicios)]
+    })
+    hoteles.to_csv(carpeta_destino / "hoteles.csv", index=False, encoding="utf-8")
+
+    # -----------------------------
+    # Generar Actividades
+    # -----------------------------
+    i_destino_actividad = np.repeat(np.arange(len(destinos)), n_actividades)
+    n_total_actividades = len(i_destino_actividad)
+    pd.DataFrame({
+        "actividad_id": np.arange(1, n_total_actividades + 1),
+        "nombre": rng.choice(NOMBRE_ACTIVIDAD, n_total_actividades),
+        "tipo": rng.choice(TIPOS_ACTIVIDAD, n_total_actividades),
+        "ciudad": destinos["ciudad"].to_numpy()[i_destino_actividad],
+        "provincia": destinos["provincia"].to_numpy()[i_destino_actividad],
+        "precio": rng.integers(20000, 80001, n_total_actividades)
+    }).to_csv(carpeta_destino / "actividades.csv", index=False, encoding="utf-8")
+
+    # -----------------------------
+    # Generar Reservas
+    # -----------------------------
+    # Índices auxiliares por posición: hotel -> destino y destino -> precio
+    destino_id_hotel = destinos["destino_id"].to_numpy()[i_destino_hotel]
+    precio_destino_hotel = destinos["precio_promedio"].to_numpy()[i_destino_hotel]
+    referencia = np.datetime64(pd.Timestamp(fecha_referencia).normalize().date(), "D")
+    desde = referencia - np.timedelta64(365, "D")
+    dias_rango = 365 + 183
+
+    for inicio in range(0, n_reservas, tamano_bloque):
+        ids = np.arange(inicio + 1, min(inicio + tamano_bloque, n_reservas) + 1)
+        i_hotel = rng.integers(0, n_total_hoteles, len(ids))
+        fechas = desde + rng.integers(0, dias_rango + 1, len(ids)).astype("timedelta64[D]")
+        _escribir_bloque_csv(pd.DataFrame({
+            "reserva_id": ids,
+            "usuario_id": rng.integers(1, n_usuarios + 1, len(ids)),
+            "destino_id": destino_id_hotel[i_hotel],
+            "hotel_id": i_hotel + 1,
+            "fecha_reserva": fechas.astype(str),
+            "estado": rng.choice(ESTADOS_RESERVA, len(ids)),
+            "precio_total": precio_destino_hotel[i_hotel] + rng.integers(-10000, 10001, len(ids))
+        }), carpeta_destino / "reservas.csv", inicio == 0)
+
+    # -----------------------------
+    # Generar relaciones
+    # -----------------------------
+    # Se muestrean pares al azar en lugar de enumerar todas las combinaciones (O(n²))
+    n_relaciones = n_relaciones if n_relaciones is not None else 5 * n_usuarios
+    usuario1 = rng.integers(1, n_usuarios + 1, n_relaciones)
+    usuario2 = rng.integers(1, n_usuarios + 1, n_relaciones)
+    relaciones = pd.DataFrame({
+        "usuario1": np.minimum(usuario1, usuario2),
+        "usuario2": np.maximum(usuario1, usuario2),
+        "tipo": rng.choice(["AMIGO_DE", "FAMILIAR_DE"], n_relaciones)
+    })
+    relaciones = relaciones[relaciones["usuario1"] != relaciones["usuario2"]]
+    relaciones = relaciones.drop_duplicates(subset=["usuario1", "usuario2"]).reset_index(drop=True)
+
+    # Límite por usuario: se numeran las apariciones de cada usuario (en cualquiera de los
+    # dos extremos) por tipo y se descartan los pares en que alguno supera el máximo
+    extremos = pd.concat([
+        relaciones[["usuario1", "tipo"]].rename(columns={"usuario1": "usuario"}),
+        relaciones[["usuario2", "tipo"]].rename(columns={"usuario2": "usuario"})
+    ]).sort_index(kind="stable")
+    extremos["orden"] = extremos.groupby(["usuario", "tipo"]).cumcount()
+    maximo = np.where(extremos["tipo"] == "AMIGO_DE", max_amigos, max_familiares)
+    excedidas = extremos.index[extremos["orden"].to_numpy() >= maximo].unique()
+    relaciones = relaciones.drop(index=excedidas)
+    relaciones.to_csv(carpeta_destino / "usuarios_relaciones.csv", index=False, encoding="utf-8")
+
+    print(f"✅ Archivos generados correctamente en {carpeta_destino}")